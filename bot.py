@@ -6,6 +6,14 @@ from discord.ext import commands
 from dotenv import load_dotenv
 import discord
 from tortoise import Tortoise
+from services.assets import asset_index, assets, expected_assets
+from services.banners import banners
+from services.catalog import catalog
+from services.gallery import gallery_index
+from services.matchmaking import matchmaker
+from services.power import backfill_power
+from services.relic_catalog import relic_catalog
+from services.schema import upgrade_constraints, upgrade_schema
 
 load_dotenv()
 
@@ -37,7 +45,18 @@ async def init_db():
         db_url=os.getenv("DATABASE_URL"),
         modules={"models": ["models"]},
     )
+    await upgrade_schema()
     await Tortoise.generate_schemas()
+    await upgrade_constraints()
+    await asset_index.load()
+    await catalog.load()
+    gallery_index.load()
+    relic_catalog.load()
+    asset_index.report(expected_assets(catalog.entries, relic_catalog.entries))
+    await banners.ensure_compiled()
+    await assets.load(bot)
+    await backfill_power()
+    await matchmaker.ensure_warm()
 
 # ----------------------------
 # Events
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from services.assets import MANIFEST_PATH, VARIANT_DIR, VARIANT_SIZES, AssetIndex, file_hash, read_manifest
+
+WEBP_QUALITY = 80
+
+
+def render(source, digest, out_dir, sizes, quality):
+    """Runs in a worker process: one downscaled WebP per size, named by source hash so reruns can reuse it."""
+    from PIL import Image
+
+    variants = {}
+    with Image.open(source) as image:
+        image.load()
+        for size in sizes:
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.LANCZOS)  # never upscales
+            path = os.path.join(out_dir, str(size), f"{digest[:20]}.webp")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            copy.save(path, "WEBP", quality=quality, method=6)
+            variants[str(size)] = {
+                "path": path, "width": copy.width, "height": copy.height,
+                "bytes": os.path.getsize(path), "hash": file_hash(path),
+            }
+    return source, variants
+
+
+def up_to_date(entry, digest, sizes) -> bool:
+    if not entry or entry.get("hash") != digest:
+        return False
+    variants = entry.get("variants", {})
+    return all(str(s) in variants and os.path.exists(variants[str(s)]["path"]) for s in sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build downscaled image variants and the manifest the cogs read.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(VARIANT_SIZES))
+    parser.add_argument("--quality", type=int, default=WEBP_QUALITY)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild every variant even if its source is unchanged")
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ Pillow is required for building variants: pip install pillow")
+
+    start = time.perf_counter()
+    index = AssetIndex()
+    index.build(index.scan())
+    previous = {} if args.force else read_manifest()
+
+    manifest, jobs = {}, []
+    for record in index.records.values():
+        entry = previous.get(record.path)
+        if up_to_date(entry, record.hash, args.sizes):
+            manifest[record.path] = entry
+        else:
+            jobs.append(record)
+            manifest[record.path] = {"hash": record.hash, "bytes": record.size, "variants": {}}
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(render, r.path, r.hash, VARIANT_DIR, args.sizes, args.quality): r.path for r in jobs
+        }
+        for future, source in futures.items():
+            try:
+                _, variants = future.result()
+            except Exception as e:
+                # A corrupt or unsupported image keeps serving its original; the rest of the run goes on
+                print(f"[WARN] Could not build variants for {source}: {e}")
+                failed.append(source)
+                continue
+            manifest[source]["variants"] = variants
+
+    # Variants whose source changed or disappeared are left behind under an old hash; drop them
+    live = {v["path"] for entry in manifest.values() for v in entry["variants"].values()}
+    removed = 0
+    for size in os.listdir(VARIANT_DIR) if os.path.isdir(VARIANT_DIR) else ():
+        folder = os.path.join(VARIANT_DIR, size)
+        for file in os.listdir(folder) if os.path.isdir(folder) else ():
+            path = os.path.join(folder, file)
+            if path not in live:
+                os.remove(path)
+                removed += 1
+
+    os.makedirs(VARIANT_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump({"sizes": args.sizes, "assets": manifest}, f, indent=1, ensure_ascii=False, sort_keys=True)
+
+    source_bytes = sum(e["bytes"] for e in manifest.values())
+    print(f"🖼️ {len(jobs) - len(failed)} rebuilt, {len(manifest) - len(jobs)} unchanged, {len(failed)} failed, "
+          f"{removed} stale files removed in {time.perf_counter() - start:.1f}s")
+    print(f"  Sources:  {source_bytes / 1024 / 1024:8.1f} MiB")
+    for size in args.sizes:
+        total = sum(e["variants"][str(size)]["bytes"] for e in manifest.values() if str(size) in e["variants"])
+        print(f"  {size:>4}px:   {total / 1024 / 1024:8.1f} MiB ({total / max(source_bytes, 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
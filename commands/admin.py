@@ -1,7 +1,12 @@
 import discord
 from discord.ext import commands
 from tortoise.exceptions import DoesNotExist
-from models import User, Character, Relic
+from models import User, Character, Relic, Collection
+from services import economy, relic_inventory
+from services.collection import collection_index
+from services.matchmaking import matchmaker
+from services.profile_cards import profile_cards
+from services.relic_catalog import relic_catalog
 import asyncio
 import json
 import os
@@ -24,8 +29,7 @@ class Admin(commands.Cog):
             return await ctx.send("❌ Currency must be either 'gold' or 'gems'.")
 
         user, _ = await User.get_or_create(discord_id=member.id, defaults={"name": member.name})
-        setattr(user, currency, getattr(user, currency) + amount)
-        await user.save()
+        await economy.grant(user.id, **{currency: amount})
 
         await ctx.send(f"✅ Given {amount} {currency} to {member.mention}.")
 
@@ -59,69 +63,13 @@ class Admin(commands.Cog):
 
         await User.all().update(gold=500, gems=50, affection=0, level=1, xp=0)
         await Character.all().delete()
+        await Collection.all().delete()
+        collection_index.forget()
+        matchmaker.forget()
+        profile_cards.forget()
 
         await ctx.send("✅ All user profiles have been reset to default.")
 
-    @commands.command(name="banwaifu", help="Remove a specific waifu from a user. Admin only.")
-    async def banwaifu(self, ctx, member: discord.Member, *, waifu_name: str):
-        if not self.is_admin(ctx):
-            return await ctx.send("❌ You are not authorized to use this command.")
-
-        try:
-            user = await User.get(discord_id=member.id)
-        except DoesNotExist:
-            return await ctx.send("❌ User not found.")
-
-        deleted_count = await Character.filter(user=user, name__iexact=waifu_name).delete()
-        if deleted_count == 0:
-            return await ctx.send(f"❌ {member.display_name} does not have a waifu named '{waifu_name}'.")
-        
-        await ctx.send(f"✅ Removed **{waifu_name}** from {member.mention}'s waifu list.")
-
-    @commands.command(name="viewdata", help="View raw user data for debugging. Admin only.")
-    async def viewdata(self, ctx, member: discord.Member):
-        if not self.is_admin(ctx):
-            return await ctx.send("❌ You are not authorized to use this command.")
-
-        try:
-            user = await User.get(discord_id=member.id).prefetch_related("waifus")
-        except DoesNotExist:
-            return await ctx.send("❌ This user has no profile.")
-
-        waifus = await Character.filter(user=user).values()
-        data = {
-            "discord_id": user.discord_id,
-            "name": user.name,
-            "gold": user.gold,
-            "gems": user.gems,
-            "affection": user.affection,
-            "level": user.level,
-            "xp": user.xp,
-            "waifus": waifus,
-        }
-
-        raw = json.dumps(data, indent=2)
-        if len(raw) > 1900:
-            with open("temp_user_data.json", "w", encoding="utf-8") as f:
-                f.write(raw)
-            await ctx.send("📦 Data too large, sending as file.")
-            await ctx.send(file=discord.File("temp_user_data.json"))
-            os.remove("temp_user_data.json")
-        else:
-            await ctx.send(f"```json\n{raw}\n```")
-
-    @commands.command(name="setlevel", help="Set a user's level. Admin only.")
-    async def setlevel(self, ctx, member: discord.Member, level: int):
-        if not self.is_admin(ctx):
-            return await ctx.send("❌ You are not authorized to use this command.")
-
-        user, _ = await User.get_or_create(discord_id=member.id, defaults={"name": member.name})
-        user.level = level
-        user.xp = 0
-        await user.save()
-
-        await ctx.send(f"✅ Set {member.mention}'s level to {level}.")
-
     @commands.command(name="resetuser", help="Reset a specific user's profile. Admin only.")
     async def resetuser(self, ctx, member: discord.Member):
         if not self.is_admin(ctx):
@@ -135,7 +83,11 @@ class Admin(commands.Cog):
         user.xp = 0
         await user.save()
 
-        await Character.filter(user=user).delete()
+        await Character.filter(owner=user).delete()
+        await Collection.filter(user=user).delete()
+        collection_index.forget(user.id)
+        matchmaker.forget(user.id)
+        profile_cards.forget(user.id)
         await ctx.send(f"✅ Reset profile for {member.mention}.")
 
     @commands.command(name="setlevel")
@@ -177,8 +129,13 @@ class Admin(commands.Cog):
 
         try:
             user = await User.get(discord_id=member.id)
-            waifu = await Character.get(name__iexact=waifu_name, user=user)
+            waifu = await Character.get(name__iexact=waifu_name, owner=user)
             await waifu.delete()
+            await Collection.filter(user=user).delete()
+            collection_index.forget(user.id)
+            matchmaker.forget(user.id)
+            # After every write: the delete signals fire before the bulk Collection delete
+            profile_cards.forget(user.id)
             await ctx.send(f"❌ Removed `{waifu_name}` from {member.name}.")
         except DoesNotExist:
             await ctx.send("❌ User or waifu not found.")
@@ -189,8 +146,7 @@ class Admin(commands.Cog):
             return await ctx.send("❌ You are not authorized.")
 
         user, _ = await User.get_or_create(discord_id=member.id)
-        user.xp += amount
-        await user.save()
+        await economy.grant(user.id, xp=amount)
         await ctx.send(f"✅ Edited XP by {amount} for {member.name}.")
 
     @commands.command(name="editaffection")
@@ -199,8 +155,7 @@ class Admin(commands.Cog):
             return await ctx.send("❌ You are not authorized.")
 
         user, _ = await User.get_or_create(discord_id=member.id)
-        user.affection += amount
-        await user.save()
+        await economy.grant(user.id, affection=amount)
         await ctx.send(f"💖 Affection changed by {amount} for {member.name}.")
 
     @commands.command(name="addrelic")
@@ -208,17 +163,14 @@ class Admin(commands.Cog):
         if ctx.author.id != self.admin_id:
             return await ctx.send("❌ You are not authorized.")
 
-        relic_path = f"store/weapons/{relic_name}.json"
-        if not os.path.exists(relic_path):
+        template = relic_catalog.get(relic_name)
+        if not template:
             return await ctx.send("❌ Relic not found.")
 
-        with open(relic_path, 'r', encoding='utf-8') as f:
-            relic_data = json.load(f)
-
         user, _ = await User.get_or_create(discord_id=member.id)
 
-        await Character.create(user=user, **relic_data)
-        await ctx.send(f"⚔️ {relic_name} has been added to {member.name}.")
+        await relic_inventory.deposit(user, [template])
+        await ctx.send(f"⚔️ {template.name} has been added to {member.name}.")
 
     @commands.command(name="addwaifu")
     async def addwaifu(self, ctx, member: discord.Member, *, waifu_name: str):
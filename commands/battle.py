@@ -2,41 +2,54 @@ name = "battle"
 description = "Engage in battles with your waifus against others."
 
 import discord
-import random
 import traceback
 from datetime import datetime
 from discord.ext import commands
 
-from models import User, Waifu, Relic, BattleHistory  # Assumed Tortoise models
+from models import User, Character, Relic, BattleHistory
+from services import economy
+from services.battle_engine import Fighter, elemental_bonus, fight, pack_replay, unpack_replay
+from services.battle_history import history
+from services.collection import collection_index
+from services.economy import user_locks
+from services.matchmaking import matchmaker, rating
+from services.power import best_waifu, refresh_power
+from services.relic_stats import relic_stats
 
 class Battle(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        history.start()
+
+    async def cog_unload(self):
+        # Flush buffered battles so a reload or shutdown doesn't drop them
+        await history.stop()
+
     def elemental_bonus(self, e1, e2):
-        chart = {
-            "Fire": "Earth", "Water": "Fire", "Earth": "Lightning",
-            "Lightning": "Water", "Light": "Dark", "Dark": "Light"
-        }
-        if e1 == chart.get(e2): return -0.1
-        if chart.get(e1) == e2: return 0.1
-        return 0
+        return elemental_bonus(e1, e2)
 
     def health_bar(self, hp, max_hp):
         total = 20
         filled = int((hp / max_hp) * total)
         return f"[{'█' * filled}{'.' * (total - filled)}] {int(hp)}/{int(max_hp)}"
 
+    def render_rounds(self, name1, name2, fight_result):
+        return [
+            f"**Round {r.number}**\n"
+            f"{name1} dealt **{r.dmg1}**{' 💥' if r.crit1 else ''} | {self.health_bar(r.hp2, fight_result.max_hp2)}\n"
+            f"{name2} dealt **{r.dmg2}**{' 💥' if r.crit2 else ''} | {self.health_bar(r.hp1, fight_result.max_hp1)}"
+            for r in fight_result.rounds
+        ]
+
     async def get_best_waifu(self, user: User):
-        waifus = await Waifu.filter(owner=user)
-        if not waifus:
-            return None
-        return max(waifus, key=lambda w: w.potential or 0)
+        return await best_waifu(user)
 
     async def get_waifu_by_name(self, user: User, name: str):
-        return await Waifu.get_or_none(owner=user, name__iexact=name)
+        return await Character.get_or_none(owner=user, name__iexact=name)
 
-    async def award_xp(self, waifu: Waifu, amount: int):
+    async def award_xp(self, waifu: Character, amount: int):
         leveled_up = False
         waifu.exp += amount
         while waifu.exp >= waifu.level * 100 and waifu.level < 100:
@@ -46,7 +59,9 @@ class Battle(commands.Cog):
             waifu.hp += 5
             waifu.crit += 1
             leveled_up = True
+        refresh_power(waifu)
         await waifu.save()
+        matchmaker.observe(waifu)
         return leveled_up, waifu.level
 
     @commands.command(name="battlereport")
@@ -57,29 +72,68 @@ class Battle(commands.Cog):
             await ctx.send(f"{target.display_name} has no recorded battle history.")
             return
 
-        history = await BattleHistory.filter(user=user).order_by("-timestamp").limit(5)
-        if not history:
+        entries = await history.recent(user, limit=5)
+        if not entries:
             await ctx.send(f"{target.display_name} has no recorded battle history.")
             return
 
+        totals = await history.totals(user)
         embed = discord.Embed(
             title=f"📜 Battle History: {target.display_name}",
+            description=f"🏆 {totals['win']}W / {totals['lose']}L / {totals['draw']}D all time",
             color=discord.Color.gold()
         )
-        for entry in history:
+        for entry in entries:
+            replay_id = f"#{entry.id} " if entry.id and entry.replay else ""
             embed.add_field(
-                name=f"{entry.waifu_name} vs {entry.opponent_name}",
+                name=f"{replay_id}{entry.waifu_name} vs {entry.opponent_name}",
                 value=f"**Result:** {entry.result.capitalize()} | 🕒 {entry.timestamp.strftime('%Y-%m-%d %H:%M')} UTC",
                 inline=False
             )
+        embed.set_footer(text="Use !replay <#> to watch a battle again")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="replay")
+    async def replay(self, ctx, battle_id: str):
+        entry = await BattleHistory.get_or_none(id=int(battle_id.lstrip("#"))) if battle_id.lstrip("#").isdigit() else None
+        if not entry or not entry.replay:
+            await ctx.send("❌ No replay found with that number. Check `!battlereport`.")
+            return
+
+        try:
+            # Replays come back in the attacker's order, whichever side's row this is
+            f1, f2, seed = unpack_replay(bytes(entry.replay), entry.waifu_name, entry.opponent_name)
+        except ValueError as e:
+            await ctx.send(f"⚠️ This battle can't be replayed: {e}.")
+            return
+        name1, name2 = f1.name, f2.name
+        fight_result = fight(f1, f2, seed=seed)
+
+        outcome = {"win": f"🏆 **{name1}** wins!", "lose": f"🏆 **{name2}** wins!", "draw": "💥 It's a draw!"}
+        embed = discord.Embed(title=f"📼 Replay #{entry.id}", color=discord.Color.dark_red())
+        embed.description = (
+            f"**{name1}** ({f1.element or 'Neutral'}) vs **{name2}** ({f2.element or 'Neutral'})\n\n"
+            + "\n\n".join(self.render_rounds(name1, name2, fight_result))
+            + f"\n\n{outcome[fight_result.outcome]}"
+        )
+        embed.set_footer(text=f"Power: {f1.potential} vs {f2.potential} | {entry.timestamp.strftime('%Y-%m-%d %H:%M')} UTC")
         await ctx.send(embed=embed)
 
     @commands.command(name="battle")
     async def battle(self, ctx, *, waifu_name=None):
+        await self.run_battle(ctx, waifu_name)
+
+    async def run_battle(self, ctx, waifu_name=None):
         try:
-            user = await User.get_or_none(discord_id=str(ctx.author.id)).prefetch_related("waifus", "relics")
-            if not user or not await Waifu.filter(owner=user).exists():
-                await ctx.send("You need to summon a waifu first using `!summon`.")
+            user = await User.get_or_none(discord_id=str(ctx.author.id))
+            w1 = None
+            if user:
+                w1 = await self.get_waifu_by_name(user, waifu_name) if waifu_name else await self.get_best_waifu(user)
+            if not w1:
+                if user and waifu_name and await Character.filter(owner=user).exists():
+                    await ctx.send(f"❌ You haven't claimed any waifu named **{waifu_name}**.")
+                else:
+                    await ctx.send("You need to summon a waifu first using `!summon`.")
                 return
 
             opponent_user = None
@@ -89,90 +143,70 @@ class Battle(commands.Cog):
                     await ctx.send("Invalid opponent.")
                     return
                 opponent_user = await User.get_or_none(discord_id=str(mentioned.id))
-                if not opponent_user or not await Waifu.filter(owner=opponent_user).exists():
+                w2 = await self.get_best_waifu(opponent_user) if opponent_user else None
+                if not w2:
                     await ctx.send("Opponent has no waifus.")
                     return
             else:
-                all_users = await User.all().prefetch_related("waifus")
-                candidates = [u for u in all_users if u.discord_id != str(ctx.author.id) and u.waifus]
-                opponent_user = random.choice(candidates) if candidates else None
-
-            w1 = await self.get_waifu_by_name(user, waifu_name) if waifu_name else await self.get_best_waifu(user)
-            w2 = await self.get_best_waifu(opponent_user) if opponent_user else await Waifu.get_random_bot_waifu()
+                await matchmaker.ensure_warm()
+                opponent_user, w2 = await matchmaker.load_opponent(user.id, rating(w1))
+                if not w2:
+                    await ctx.send("🔍 No opponents of similar strength are available right now.")
+                    return
 
-            if not w1 or not w2:
-                await ctx.send("❌ Could not load one of the waifus.")
-                return
+            # Both sides' waifus are saved below, so hold both owners' locks (the same ones !upgrade and
+            # !train take) and re-read the rows under them rather than writing back stale copies
+            async with user_locks.many(ctx.author.id, int(opponent_user.discord_id)):
+                w1 = await Character.get_or_none(id=w1.id)
+                w2 = await Character.get_or_none(id=w2.id)
+                if not w1 or not w2:
+                    await ctx.send("⚠️ One of the waifus is no longer available. Try again.")
+                    return
 
-            relic1 = await Relic.get_or_none(owner=user, assigned_to=w1.name)
-            relic2 = await Relic.get_or_none(owner=opponent_user, assigned_to=w2.name) if opponent_user else None
-
-            def relic_boost(r: Relic):
-                return (r.atk_boost or 0, r.hp_boost or 0, r.crit_boost or 0) if r else (0, 0, 0)
-
-            atk1b, hp1b, _ = relic_boost(relic1)
-            atk2b, hp2b, _ = relic_boost(relic2)
-
-            max_hp1 = hp1 = 1000 + (w1.potential or 0) / 2 + hp1b
-            max_hp2 = hp2 = 1000 + (w2.potential or 0) / 2 + hp2b
-
-            bonus1 = self.elemental_bonus(w1.element, w2.element)
-            bonus2 = self.elemental_bonus(w2.element, w1.element)
-            battle_log = []
-            round_num = 1
-
-            while hp1 > 0 and hp2 > 0 and round_num <= 10:
-                dmg1 = int(random.uniform(0, 100) + (w1.potential or 0) * 0.05 + bonus1 * 20 + atk1b)
-                dmg2 = int(random.uniform(0, 100) + (w2.potential or 0) * 0.05 + bonus2 * 20 + atk2b)
-                crit1 = random.random() < (w1.crit or 0) / 100
-                crit2 = random.random() < (w2.crit or 0) / 100
-                if crit1: dmg1 = int(dmg1 * 1.5)
-                if crit2: dmg2 = int(dmg2 * 1.5)
-                hp2 -= dmg1
-                hp1 -= dmg2
-
-                battle_log.append(
-                    f"**Round {round_num}**\n"
-                    f"{w1.name} dealt **{dmg1}**{' 💥' if crit1 else ''} | {self.health_bar(hp2, max_hp2)}\n"
-                    f"{w2.name} dealt **{dmg2}**{' 💥' if crit2 else ''} | {self.health_bar(hp1, max_hp1)}"
-                )
-                round_num += 1
-
-            result_text = ""
-            xp = 20
-            timestamp = datetime.utcnow()
-
-            if hp1 <= 0 and hp2 <= 0:
-                result_text = "💥 It's a draw!"
-                await self.award_xp(w1, xp)
-                if w2: await self.award_xp(w2, xp)
-                result1, result2 = "draw", "draw"
-            elif hp1 > hp2:
-                result_text = f"🏆 **{ctx.author.display_name}**'s **{w1.name}** wins!"
-                up, lv = await self.award_xp(w1, xp)
-                if up: result_text += f" 🎉 Level up to **{lv}**!"
-                user.gold += 100
-                result1, result2 = "win", "lose"
-            else:
-                result_text = f"🏆 **{opponent_user.discord_name if opponent_user else 'Bot'}**'s **{w2.name}** wins!"
-                if w2:
-                    up, lv = await self.award_xp(w2, xp)
+                relic_ids = [r for r in (w1.relic_id, w2.relic_id) if r]
+                relics = {r.id: r for r in await Relic.filter(id__in=relic_ids)} if relic_ids else {}
+                f1 = Fighter.from_waifu(w1, relic_stats.for_relic(relics.get(w1.relic_id), w1.name))
+                f2 = Fighter.from_waifu(w2, relic_stats.for_relic(relics.get(w2.relic_id), w2.name))
+                # Fates only apply when the owner has collected the angels they name
+                if f1.kit:
+                    f1.fates = f1.kit.active_fates(await collection_index.bits(user))
+                if f2.kit and opponent_user:
+                    f2.fates = f2.kit.active_fates(await collection_index.bits(opponent_user))
+                fight_result = fight(f1, f2)
+
+                battle_log = self.render_rounds(w1.name, w2.name, fight_result)
+
+                result_text = ""
+                xp = 20
+                timestamp = datetime.utcnow()
+
+                if fight_result.outcome == "draw":
+                    result_text = "💥 It's a draw!"
+                    await self.award_xp(w1, xp)
+                    if w2: await self.award_xp(w2, xp)
+                    result1, result2 = "draw", "draw"
+                elif fight_result.outcome == "win":
+                    result_text = f"🏆 **{ctx.author.display_name}**'s **{w1.name}** wins!"
+                    up, lv = await self.award_xp(w1, xp)
                     if up: result_text += f" 🎉 Level up to **{lv}**!"
-                    opponent_user.gold += 100
-                result1, result2 = "lose", "win"
-
-            await user.save()
-            if opponent_user:
-                await opponent_user.save()
-
-            # Record history
-            await BattleHistory.create(user=user, waifu_name=w1.name, opponent_name=w2.name, result=result1, timestamp=timestamp)
-            if opponent_user:
-                await BattleHistory.create(user=opponent_user, waifu_name=w2.name, opponent_name=w1.name, result=result2, timestamp=timestamp)
+                    await economy.grant(user.id, gold=100)
+                    result1, result2 = "win", "lose"
+                else:
+                    result_text = f"🏆 **{opponent_user.name if opponent_user else 'Bot'}**'s **{w2.name}** wins!"
+                    if w2:
+                        up, lv = await self.award_xp(w2, xp)
+                        if up: result_text += f" 🎉 Level up to **{lv}**!"
+                        await economy.grant(opponent_user.id, gold=100)
+                    result1, result2 = "lose", "win"
+
+                # Record history (buffered, written in batches) with a replay instead of the rendered log
+                history.record(user, w1.name, w2.name, result1, timestamp, pack_replay(f1, f2, fight_result.seed))
+                if opponent_user:
+                    history.record(opponent_user, w2.name, w1.name, result2, timestamp, pack_replay(f1, f2, fight_result.seed, swapped=True))
 
             embed = discord.Embed(title="⚔️ Battle Report", color=discord.Color.red())
-            embed.description = f"**{w1.name}** ({w1.element}) vs **{w2.name}** ({w2.element})\n\n" + "\n\n".join(battle_log) + f"\n\n{result_text}"
-            embed.set_footer(text=f"Power: {w1.potential} vs {w2.potential}")
+            embed.description = f"**{w1.name}** ({f1.element or 'Neutral'}) vs **{w2.name}** ({f2.element or 'Neutral'})\n\n" + "\n\n".join(battle_log) + f"\n\n{result_text}"
+            embed.set_footer(text=f"Power: {f1.potential} vs {f2.potential}")
             await ctx.send(embed=embed)
         except Exception as e:
             traceback.print_exc()
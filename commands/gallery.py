@@ -1,138 +1,87 @@
 # commands/gallery.py
 import discord
-import os
 from discord.ext import commands
-from models import User, ClaimedWaifu  # Assuming these models are defined
+from models import User, Character
+from services.assets import assets
+from services.gallery import gallery_index
+from services.views import reject_stranger, stateless_view
 from tortoise.exceptions import DoesNotExist
-import json
-
-class GalleryImageView(discord.ui.View):
-    def __init__(self, character, waifu_name, user_id, characters_dir):
-        super().__init__(timeout=180)
-        self.character = character
-        self.waifu_name = waifu_name
-        self.user_id = user_id
-        self.characters_dir = characters_dir
-        self.index = 0
-        self.update_buttons()
-
-    def update_buttons(self):
-        self.clear_items()
-        if self.index > 0:
-            self.add_item(discord.ui.Button(label="⬅️ Previous", style=discord.ButtonStyle.secondary, custom_id="prev"))
-        if self.index < len(self.character["gallery"]) - 1:
-            self.add_item(discord.ui.Button(label="➡️ Next", style=discord.ButtonStyle.secondary, custom_id="next"))
-
-        for child in self.children:
-            child.callback = self.button_callback
-
-    async def button_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This is not your gallery session.", ephemeral=True)
-            return
-
-        if interaction.data["custom_id"] == "next":
-            self.index += 1
-        elif interaction.data["custom_id"] == "prev":
-            self.index -= 1
-
-        self.index = max(0, min(self.index, len(self.character["gallery"]) - 1))
-        self.update_buttons()
-
-        title = self.character["gallery"][self.index]
-        image_filename = f"{self.waifu_name.lower()} - {self.index + 1}.webp"
-        image_path = os.path.join(self.characters_dir, image_filename)
-
-        embed = discord.Embed(
-            title=f"💗 {self.character.get('name')} - {title}",
-            description=f"📸 Outfit {self.index + 1} of {len(self.character['gallery'])}",
-            color=0xFF69B4
-        )
-
-        if os.path.exists(image_path):
-            file = discord.File(image_path, filename=image_filename)
-            embed.set_image(url=f"attachment://{image_filename}")
-            await interaction.response.edit_message(embed=embed, attachments=[file], view=self)
-        else:
-            embed.description += "\n⚠️ Image not found."
-            await interaction.response.edit_message(embed=embed, attachments=[], view=self)
-
-class WaifuSelectView(discord.ui.View):
-    def __init__(self, waifus, user_id, characters_dir):
-        super().__init__(timeout=120)
-        self.waifus = waifus
-        self.user_id = user_id
-        self.characters_dir = characters_dir
-
-        for i, waifu in enumerate(waifus, start=1):
-            self.add_item(discord.ui.Button(label=f"{i}. {waifu}", style=discord.ButtonStyle.primary, custom_id=str(i)))
-
-        for child in self.children:
-            child.callback = self.waifu_callback
-
-    async def waifu_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ You can't use this menu.", ephemeral=True)
-            return
 
-        index = int(interaction.data["custom_id"]) - 1
-        waifu_name = self.waifus[index]
-        char_file = os.path.join(self.characters_dir, f"{waifu_name}.json")
-
-        if not os.path.exists(char_file):
-            await interaction.response.send_message(f"⚠️ Data for {waifu_name} not found.", ephemeral=True)
+MAX_BUTTONS = 25  # Discord's component limit per message
+
+async def render_outfit(gallery, index):
+    title, image_path = gallery.outfits[index]
+    embed = discord.Embed(
+        title=f"💗 {gallery.name} - {title}",
+        description=f"📸 Outfit {index + 1} of {len(gallery)}",
+        color=0xFF69B4
+    )
+    file = await assets.attach(embed, image_path) if image_path else None
+    if not image_path:
+        embed.description += "\n⚠️ Image not found."
+    return embed, [file] if file else []
+
+class GalleryButton(discord.ui.DynamicItem[discord.ui.Button], template=r"gallery:(?P<owner>\d+):(?P<template>\d+):(?P<index>\d+)"):
+    """Opens outfit `index` of a template's gallery; the picker and the prev/next buttons are all this."""
+
+    def __init__(self, label, owner_id, template_id, index, style=discord.ButtonStyle.secondary):
+        self.owner_id, self.template_id, self.index = int(owner_id), int(template_id), int(index)
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=f"gallery:{owner_id}:{template_id}:{index}"))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(item.label, match["owner"], match["template"], match["index"], item.style)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await reject_stranger(interaction, self.owner_id, "❌ This is not your gallery session.")
+
+    async def callback(self, interaction: discord.Interaction):
+        gallery = gallery_index.get_id(self.template_id)
+        if gallery is None:
+            await interaction.response.send_message("⚠️ This gallery is no longer available.", ephemeral=True)
             return
-
-        with open(char_file, 'r', encoding='utf-8') as f:
-            character = json.load(f)
-
-        if not character.get("gallery"):
-            await interaction.response.send_message(f"❌ No gallery entries found for {waifu_name}.", ephemeral=True)
-            return
-
-        title = character["gallery"][0]
-        image_filename = f"{waifu_name.lower()} - 1.webp"
-        image_path = os.path.join(self.characters_dir, image_filename)
-
-        embed = discord.Embed(
-            title=f"💗 {character.get('name')} - {title}",
-            description=f"📸 Outfit 1 of {len(character['gallery'])}",
-            color=0xFF69B4
-        )
-
-        view = GalleryImageView(character, waifu_name, interaction.user.id, self.characters_dir)
-
-        if os.path.exists(image_path):
-            file = discord.File(image_path, filename=image_filename)
-            embed.set_image(url=f"attachment://{image_filename}")
-            await interaction.response.edit_message(embed=embed, attachments=[file], view=view)
-        else:
-            embed.description += "\n⚠️ Image not found."
-            await interaction.response.edit_message(embed=embed, attachments=[], view=view)
+        index = max(0, min(self.index, len(gallery) - 1))
+        embed, files = await render_outfit(gallery, index)
+        await interaction.response.edit_message(embed=embed, attachments=files, view=outfit_buttons(gallery, self.owner_id, index))
+
+def outfit_buttons(gallery, owner_id, index):
+    buttons = []
+    if index > 0:
+        buttons.append(GalleryButton("⬅️ Previous", owner_id, gallery.id, index - 1))
+    if index < len(gallery) - 1:
+        buttons.append(GalleryButton("➡️ Next", owner_id, gallery.id, index + 1))
+    return stateless_view(*buttons)
+
+def picker_buttons(galleries, owner_id):
+    return stateless_view(*(
+        GalleryButton(f"{i}. {g.name}", owner_id, g.id, 0, style=discord.ButtonStyle.primary)
+        for i, g in enumerate(galleries, start=1)
+    ))
 
 class Gallery(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.characters_dir = os.path.join(os.path.dirname(__file__), '../characters')
 
     @commands.command(name='gallery', help='Display your unlocked waifu gallery')
     async def gallery(self, ctx):
         user_id = str(ctx.author.id)
 
         try:
-            user = await User.get(discord_id=user_id).prefetch_related('claimed_waifus')
+            user = await User.get(discord_id=user_id)
         except DoesNotExist:
             await ctx.send('❌ You haven’t claimed any waifus yet! Use `!summon` to get started.')
             return
 
-        waifu_names = [waifu.character_name for waifu in user.claimed_waifus]
+        names = await Character.filter(owner=user).order_by("-power", "id").values_list("name", flat=True)
+        # Deduped in order: two rows with one name would give two buttons with the same custom_id
+        galleries = list({g.id: g for g in map(gallery_index.get, names) if g}.values())
 
-        if not waifu_names:
-            await ctx.send('❌ No claimed waifus found.')
+        if not galleries:
+            await ctx.send('❌ No claimed waifus with a gallery found.')
             return
 
-        view = WaifuSelectView(waifu_names, ctx.author.id, self.characters_dir)
-        await ctx.send("📚 **Choose a waifu to view their gallery:**", view=view)
+        await ctx.send("📚 **Choose a waifu to view their gallery:**", view=picker_buttons(galleries[:MAX_BUTTONS], ctx.author.id))
 
 async def setup(bot):
+    bot.add_dynamic_items(GalleryButton)
     await bot.add_cog(Gallery(bot))
@@ -1,10 +1,11 @@
 import discord
-import os
 import random
-import time
 from discord.ext import commands
 from tortoise.exceptions import DoesNotExist
-from models import User, CharacterInstance, Character  # Adjust if model paths differ
+from models import User, Character
+from services import economy
+from services.cooldowns import cooldowns
+from services.assets import THUMBNAIL, asset_index, assets
 
 name = "intimate"
 description = "Interact intimately with your waifus."
@@ -17,7 +18,13 @@ SCENES = [  # [snipped for brevity] — keep your full SCENES list here.
 class Intimate(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cooldowns = {}  # per-user cooldown tracking
+        self.cooldown_seconds = 60 * 60 * 3  # 3 hour cooldown
+
+    async def cog_load(self):
+        cooldowns.start()
+
+    async def cog_unload(self):
+        await cooldowns.flush()
 
     @commands.command(name='intimate', help='Have an intimate scene with one of your waifus (NSFW only)')
     async def intimate(self, ctx):
@@ -26,40 +33,25 @@ class Intimate(commands.Cog):
 
         user_id = ctx.author.id
 
+        # Checked from memory before any query; released again if there's no waifu to spend it on
+        remaining = await cooldowns.check_and_set(user_id, "intimate", self.cooldown_seconds)
+        if remaining:
+            return await ctx.send(f'💤 You need to wait **{int(remaining // 60) + 1} more minutes** before another intimate moment.')
+
         try:
-            user = await User.get(discord_id=user_id).prefetch_related("waifus__character")
+            user = await User.get(discord_id=str(user_id))
         except DoesNotExist:
+            cooldowns.reset(user_id, "intimate")
             return await ctx.send('You must summon and own at least one waifu before doing this. Try `!summon`.')
 
-        waifus = await user.waifus.all().prefetch_related("character")
+        waifus = await Character.filter(owner=user)
         if not waifus:
+            cooldowns.reset(user_id, "intimate")
             return await ctx.send('You must summon and own at least one waifu before doing this. Try `!summon`.')
 
-        # Cooldown logic (3 hours)
-        now = time.time()
-        cooldown_period = 60 * 60 * 3
-        last_used = self.cooldowns.get(user_id, 0)
-        if now - last_used < cooldown_period:
-            remaining = int((cooldown_period - (now - last_used)) // 60) + 1
-            return await ctx.send(f'💤 You need to wait **{remaining} more minutes** before another intimate moment.')
-
-        self.cooldowns[user_id] = now
-
-        # Pick random waifu and character
-        waifu_instance = random.choice(waifus)
-        character = waifu_instance.character
-
-        # Increment affection
-        waifu_instance.affection += 5
-        await waifu_instance.save()
-
-        # Load image file (e.g. "characters/character - 1.webp")
-        image_path = None
-        characters_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../characters"))
-        for file in os.listdir(characters_dir):
-            if file.lower().startswith(character.name.lower()) and file.endswith(".webp"):
-                image_path = os.path.join(characters_dir, file)
-                break
+        # Pick random waifu; affection is tracked per user
+        character = random.choice(waifus)
+        await economy.grant(user.id, affection=5)
 
         # Format scene
         scene = random.choice(SCENES).format(waifu=character.name)
@@ -69,14 +61,10 @@ class Intimate(commands.Cog):
             description=scene,
             color=0xFF69B4,
         )
-        if image_path:
-            embed.set_thumbnail(url=f"attachment://{os.path.basename(image_path)}")
+        file = await assets.attach(embed, asset_index.resolve("characters", character.name, size=THUMBNAIL), thumbnail=True)
         embed.set_footer(text="NSFW Scene - You feel closer to her now.")
 
-        if image_path:
-            await ctx.send(embed=embed, file=discord.File(image_path))
-        else:
-            await ctx.send(embed=embed)
+        await ctx.send(embed=embed, file=file)
 
 
 async def setup(bot):
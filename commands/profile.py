@@ -3,112 +3,81 @@ import discord
 from discord.ext import commands
 from tortoise.exceptions import DoesNotExist
 from models import User, Character
+from services.collection import collection_index
+from services.pagination import PageButton, PagedView
+from services.profile_cards import TOP_WAIFUS, profile_cards, roster_summary, showcase
+from services.relic_stats import relic_stats
 import os
 import json
 import time
 
 CHAR_PER_PAGE = 10
+EQUIPPED_SHOWN = 10
 
 def xp_bar(xp, level):
     xp_needed = level * 100
     progress = int((xp / xp_needed) * 10) if xp_needed > 0 else 0
     return "▰" * progress + "▱" * (10 - progress)
 
-def get_potential_score(potential):
-    if isinstance(potential, dict):
-        return sum(potential.values())
-    return 0
-
-class NavigationButton(discord.ui.Button):
-    def __init__(self, label, direction):
-        super().__init__(label=label, style=discord.ButtonStyle.secondary)
-        self.direction = direction
-
-    async def callback(self, interaction: discord.Interaction):
-        view: ProfileView = self.view
-        view.page += self.direction
-        view.update_buttons()
-        await interaction.response.edit_message(embed=view.get_embed(), view=view)
-
-class SortButton(discord.ui.Button):
-    def __init__(self, label, sort_by):
-        super().__init__(label=label, style=discord.ButtonStyle.primary)
-        self.sort_by = sort_by
-
-    async def callback(self, interaction: discord.Interaction):
-        view: ProfileView = self.view
-        if view.sort_by != self.sort_by:
-            view.sort_by = self.sort_by
-            view.sort_waifus()
-            view.page = 0
-            view.update_buttons()
-        await interaction.response.edit_message(embed=view.get_embed(), view=view)
-
-class ProfileView(discord.ui.View):
-    def __init__(self, user_id, waifus, characters_dir, sort_by="potential", page=0):
-        super().__init__(timeout=60)
-        self.user_id = user_id
-        self.waifus_raw = waifus
-        self.characters_dir = characters_dir
-        self.sort_by = sort_by
-        self.page = page
-        self.per_page = CHAR_PER_PAGE
-        self.sort_waifus()
-        self.update_buttons()
-
-    def sort_waifus(self):
-        if self.sort_by == "level":
-            self.waifus = sorted(self.waifus_raw, key=lambda w: w.level, reverse=True)
-        else:
-            self.waifus = sorted(self.waifus_raw, key=lambda w: get_potential_score(w.potential), reverse=True)
-        self.max_page = max(0, (len(self.waifus) - 1) // self.per_page)
-
-    def update_buttons(self):
-        self.clear_items()
-        if self.page > 0:
-            self.add_item(NavigationButton("◀️ Prev", direction=-1))
-        if self.page < self.max_page:
-            self.add_item(NavigationButton("▶️ Next", direction=1))
-        self.add_item(SortButton("Sort by Potential", "potential"))
-        self.add_item(SortButton("Sort by Level", "level"))
-
-    def get_embed(self):
+class ProfileView(PagedView):
+    """The waifu roster, fetched a page at a time via the (owner, power) / (owner, level) indexes."""
+
+    kind = "roster"
+    sorts = ("power", "level")
+    per_page = CHAR_PER_PAGE
+
+    def queryset(self):
+        return Character.filter(owner__discord_id=str(self.owner_id))
+
+    def extra_buttons(self, total):
+        return tuple(
+            PageButton(f"Sort by {sort.title()}", self.kind, self.owner_id, sort, 0, "f", total, style=discord.ButtonStyle.primary)
+            for sort in self.sorts
+        )
+
+    def render(self, rows, start):
         embed = discord.Embed(
-            title=f"📝 Your Waifus (Sorted by {self.sort_by.title()})",
+            title=f"📝 Your Waifus (Sorted by {self.sort.title()})",
             color=discord.Color.pink()
         )
-        start = self.page * self.per_page
-        end = start + self.per_page
-        waifu_list = self.waifus[start:end]
-        for i, w in enumerate(waifu_list, start=start + 1):
+        for i, w in enumerate(rows, start=start):
             embed.add_field(
                 name=f"{i}. {w.name}",
-                value=f"Lvl {w.level} | ❤️ {w.hp} HP | ⚔️ {w.atk} ATK",
+                value=f"Lvl {w.level} | ❤️ {w.hp} HP | ⚔️ {w.atk} ATK | 💪 {w.power}",
                 inline=False
             )
-        embed.set_footer(text=f"Page {self.page + 1}/{self.max_page + 1}")
         return embed
 
-    async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        return interaction.user.id == self.user_id
-
 class Profile(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.characters_dir = 'characters'
 
     @commands.command(name="profile")
-    async def profile(self, ctx, sort_by="potential"):
-        try:
-            user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("waifus")
-        except DoesNotExist:
-            await ctx.send("❌ You don't have a profile yet.")
-            return
-
-        waifus = await user.waifus.all()
-        if not waifus:
+    async def profile(self, ctx, sort_by="power"):
+        card = profile_cards.get(ctx.author.id)
+        if card is None:
+            try:
+                user = await User.get(discord_id=str(ctx.author.id))
+            except DoesNotExist:
+                await ctx.send("❌ You don't have a profile yet.")
+                return
+            card = await self.build_card(user)
+            profile_cards.put(user, card)
+
+        if not card["waifus"]:
             await ctx.send("😢 You haven't claimed any waifus yet.")
             return
+        await ctx.send(embed=discord.Embed.from_dict(card["embed"]))
+
+        embed, view = await ProfileView(ctx.author.id, sort_by).open(total=card["waifus"])
+        await ctx.send(embed=embed, view=view)
+
+    async def build_card(self, user) -> dict:
+        summary = await roster_summary(user)
+        card = {"waifus": summary["waifus"], "embed": None}
+        if not summary["waifus"]:
+            return card
 
         profile_embed = discord.Embed(
             title=f"💫 {user.name}'s Profile",
@@ -117,19 +86,33 @@ class Profile(commands.Cog):
         )
         profile_embed.add_field(name="💰 Gold", value=str(user.gold), inline=True)
         profile_embed.add_field(name="💎 Gems", value=str(user.gems), inline=True)
-        profile_embed.add_field(name="🌸 Claimed Waifus", value=str(len(waifus)), inline=True)
+        profile_embed.add_field(name="🌸 Claimed Waifus", value=str(summary["waifus"]), inline=True)
         profile_embed.add_field(name="❤️ Affection", value=str(user.affection), inline=True)
         profile_embed.add_field(name="🧪 Summons Used", value=str(user.summon_count), inline=True)
         profile_embed.add_field(name="📈 Level / XP", value=f"Lvl {user.level} / {user.xp} XP", inline=True)
 
-        relics = [w.relic for w in waifus if w.relic]
-        if relics:
-            profile_embed.add_field(name="🗡️ Equipped Relics", value=", ".join(set(relics)), inline=False)
+        owned, total, ratio = await collection_index.completion(user)
+        profile_embed.add_field(name="📚 Collection", value=f"{owned}/{total} ({ratio:.0%})", inline=True)
+        profile_embed.add_field(name="💪 Total Power", value=str(summary["total_power"]), inline=True)
+
+        top, equipped = await showcase(user, TOP_WAIFUS, EQUIPPED_SHOWN)
+        profile_embed.add_field(
+            name="🏆 Top Waifus",
+            value="\n".join(f"{i}. **{w.name}** (Lvl {w.level}) 💪 {w.power}" for i, w in enumerate(top, start=1)),
+            inline=False
+        )
 
-        await ctx.send(embed=profile_embed)
+        if equipped:
+            lines = [
+                f"**{w.relic.name}** → {w.name}: {relic_stats.for_relic(w.relic, w.name).summary or 'No attributes'}"
+                for w in equipped
+            ]
+            if summary["equipped"] > len(equipped):
+                lines.append(f"…and {summary['equipped'] - len(equipped)} more")
+            profile_embed.add_field(name="🗡️ Equipped Relics", value="\n".join(lines)[:1024], inline=False)
 
-        view = ProfileView(ctx.author.id, waifus, self.characters_dir, sort_by=sort_by)
-        await ctx.send(embed=view.get_embed(), view=view)
+        card["embed"] = profile_embed.to_dict()
+        return card
 
     @commands.command(name="characters")
     async def character_count(self, ctx):
@@ -140,4 +123,5 @@ class Profile(commands.Cog):
         await ctx.send(f"📖 Total characters in bot: **{count}**")
 
 async def setup(bot):
+    bot.add_dynamic_items(PageButton)
     await bot.add_cog(Profile(bot))
@@ -1,121 +1,152 @@
 import discord
+from collections import Counter
 from discord.ext import commands
-import os
-import json
-import random
-from tortoise.exceptions import DoesNotExist
+from tortoise.transactions import in_transaction
 from models import User, Character, Relic
+from services import economy, relic_inventory
+from services.assets import THUMBNAIL, asset_index, assets
+from services.economy import InsufficientFunds, user_locks
+from services.matchmaking import matchmaker
+from services.pagination import PageButton, PagedView
+from services.power import refresh_power, relic_power
+from services.relic_catalog import RARITY_WEIGHTS, relic_catalog
+from services.relic_stats import relic_stats
 
 class Relics(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.relics_dir = os.path.join("store", "weapons")
 
-    def get_relic_files(self):
-        return [f for f in os.listdir(self.relics_dir) if f.endswith(".json")]
-
-    def load_relic(self, filename):
-        with open(os.path.join(self.relics_dir, filename), "r", encoding="utf-8") as f:
-            return json.load(f)
+    async def refresh_equipped(self, relic):
+        # Level and awaken change the relic's table slot, so re-score whoever has it equipped
+        for waifu in await Character.filter(relic_id=relic.id):
+            waifu.relic_power = relic_power(relic, waifu)
+            refresh_power(waifu)
+            await waifu.save(update_fields=["relic_power", "power"])
+            matchmaker.observe(waifu)
 
     @commands.command(name="assignrelic")
     async def assign_relic(self, ctx, relic_name: str, waifu_name: str):
-        user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("relics", "waifus")
-        relic = next((r for r in await user.relics.all() if r.name.lower() == relic_name.lower()), None)
-        waifu = next((w for w in await user.waifus.all() if w.name.lower() == waifu_name.lower()), None)
+        # Same lock as the other relic commands, so two assigns can't both take the last free copy
+        async with user_locks(ctx.author.id):
+            await self.run_assign_relic(ctx, relic_name, waifu_name)
+
+    async def run_assign_relic(self, ctx, relic_name: str, waifu_name: str):
+        user = await User.get(discord_id=str(ctx.author.id))
+        relic = await relic_inventory.find(user.id, relic_name)
+        waifu = await Character.filter(owner=user, name__iexact=waifu_name).first()
 
         if not relic:
             return await ctx.send("❌ Relic not found in your inventory.")
         if not waifu:
             return await ctx.send("❌ Waifu not found.")
+        # A stack row holds `count` copies; each equipped waifu uses one of them
+        if await Character.filter(relic_id=relic.id).exclude(id=waifu.id).count() >= relic.count:
+            return await ctx.send(f"❌ Every copy of **{relic.name}** is already equipped.")
 
         waifu.relic = relic
+        waifu.relic_power = relic_power(relic, waifu)
+        refresh_power(waifu)
         await waifu.save()
+        matchmaker.observe(waifu)
         await ctx.send(f"✅ Assigned **{relic_name}** to **{waifu_name}**.")
 
     @commands.command(name="relicsummon")
     async def relic_summon(self, ctx, amount: int = 1):
+        # deposit() reads the user's stacks before inserting new ones; two summons at once would both insert
+        async with user_locks(ctx.author.id):
+            await self.run_relic_summon(ctx, amount)
+
+    async def run_relic_summon(self, ctx, amount: int = 1):
         user = await User.get(discord_id=str(ctx.author.id))
 
         if user.level < 60:
             return await ctx.send("🔒 Relics unlock at level 60!")
+        if amount < 1:
+            return await ctx.send("❌ Amount must be at least 1.")
         cost = 50 * amount
-        if user.diamonds < cost:
-            return await ctx.send(f"❌ You need {cost} diamonds.")
-
-        relic_files = self.get_relic_files()
-        pulled = []
-
-        for _ in range(amount):
-            filename = random.choice(relic_files)
-            relic_data = self.load_relic(filename)
-
-            relic = await Relic.create(
-                name=relic_data["name"],
-                quality=relic_data["quality"],
-                attributes=relic_data.get("attributes", []),
-                image=relic_data.get("image", ""),
-                level=1,
-                awaken=0,
-                owner=user
-            )
-            pulled.append(relic)
-
-        user.diamonds -= cost
-        await user.save()
-
-        embed = discord.Embed(title=f"🔮 Relic Summon x{amount}", color=0x55ffff)
-        for relic in pulled:
-            embed.add_field(name=f"{relic.quality} ⭐ {relic.name}", value="Relic summoned!", inline=False)
-            if relic.image:
-                embed.set_thumbnail(url=f"attachment://{relic.image}")
-        await ctx.send(embed=embed)
+        # Turn away what the balance can't cover before drawing, so a huge amount costs nothing to refuse
+        if user.gems < cost:
+            return await ctx.send(f"❌ You need {cost} gems.")
+
+        # Gems and relics commit together: a failed insert refunds, a failed charge creates nothing
+        async with in_transaction() as conn:
+            if not await economy.spend(user.id, using_db=conn, gems=cost):
+                return await ctx.send(f"❌ You need {cost} gems.")
+            # Draws come from the preloaded pools; nothing touches store/weapons per pull
+            pulled = relic_catalog.sample(amount)
+            await relic_inventory.deposit(user, pulled, using_db=conn)
+
+        # One line per distinct relic keeps big pulls under Discord's embed limits
+        counts = Counter(pulled)
+        lines = [f"{t.quality} ⭐ {t.name}{f' x{n}' if n > 1 else ''}" for t, n in counts.items()]
+        embed = discord.Embed(title=f"🔮 Relic Summon x{amount}", description="\n".join(lines)[:4000], color=0x55ffff)
+        rarest = min(counts, key=lambda t: (RARITY_WEIGHTS[t.rarity], t.weight))
+        file = await assets.attach(embed, asset_index.resolve("relics", rarest.name, size=THUMBNAIL), thumbnail=True)
+        await ctx.send(embed=embed, file=file)
 
     @commands.command(name="relicupgrade")
     async def relic_upgrade(self, ctx, name: str):
-        user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("relics")
-        relics = [r for r in await user.relics.all() if r.name.lower() == name.lower()]
+        async with user_locks(ctx.author.id):
+            await self.run_relic_upgrade(ctx, name)
 
-        if len(relics) < 2:
+    async def run_relic_upgrade(self, ctx, name: str):
+        user = await User.get(discord_id=str(ctx.author.id))
+        stack = await relic_inventory.find(user.id, name, min_count=2)
+        if not stack:
             return await ctx.send("❌ You need at least 2 of the same relic to upgrade.")
 
-        base = relics[0]
-        await relics[1].delete()
-        base.level += 1
-        if "+" not in base.quality:
-            base.quality += "+"
-        await base.save()
-        await ctx.send(f"✅ {name} upgraded to Level {base.level}!")
+        # One copy is fed into another, which moves up a level
+        quality = stack.quality if "+" in stack.quality else stack.quality + "+"
+        base = await relic_inventory.transform(stack, consume=2, level=stack.level + 1, quality=quality)
+        if not base:
+            return await ctx.send("❌ You need at least 2 of the same relic to upgrade.")
+        await self.refresh_equipped(base)
+        await ctx.send(f"✅ {base.name} upgraded to Level {base.level}!")
 
     @commands.command(name="relicinherit")
     async def relic_inherit(self, ctx, from_name: str, to_name: str, inherit_type: str):
-        user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("relics")
-        if user.diamonds < 100:
-            return await ctx.send("❌ You need 100 diamonds for inheritance.")
+        async with user_locks(ctx.author.id):
+            await self.run_relic_inherit(ctx, from_name, to_name, inherit_type)
+
+    async def run_relic_inherit(self, ctx, from_name, to_name, inherit_type):
+        user = await User.get(discord_id=str(ctx.author.id))
+        if user.gems < 100:
+            return await ctx.send("❌ You need 100 gems for inheritance.")
 
-        relics = await user.relics.all()
-        from_relic = next((r for r in relics if r.name.lower() == from_name.lower()), None)
-        to_relic = next((r for r in relics if r.name.lower() == to_name.lower()), None)
+        from_relic = await relic_inventory.find(user.id, from_name)
+        to_relic = await relic_inventory.find(user.id, to_name)
 
         if not from_relic or not to_relic:
             return await ctx.send("❌ Relic(s) not found.")
 
         if inherit_type == "quality":
-            to_relic.quality = from_relic.quality
+            changes = {"quality": from_relic.quality}
         elif inherit_type == "awaken" and user.level >= 110:
-            to_relic.awaken = from_relic.awaken
+            changes = {"awaken": from_relic.awaken}
         else:
             return await ctx.send("❌ Invalid type or conditions not met.")
 
-        user.diamonds -= 100
-        await user.save()
-        await to_relic.save()
+        # The copy is only changed if the gems go through, and vice versa
+        try:
+            async with in_transaction() as conn:
+                to_relic = await relic_inventory.transform(to_relic, using_db=conn, **changes)
+                if to_relic:
+                    await economy.spend_or_raise(user.id, using_db=conn, gems=100)
+        except InsufficientFunds:
+            return await ctx.send("❌ You need 100 gems for inheritance.")
+        if not to_relic:
+            return await ctx.send("❌ Relic(s) not found.")
+        await self.refresh_equipped(to_relic)
         await ctx.send(f"🔁 Inherited {inherit_type} from {from_name} to {to_name}.")
 
     @commands.command(name="relicawaken")
     async def relic_awaken(self, ctx, name: str):
-        user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("relics")
-        relic = next((r for r in await user.relics.all() if r.name.lower() == name.lower()), None)
+        async with user_locks(ctx.author.id):
+            await self.run_relic_awaken(ctx, name)
+
+    async def run_relic_awaken(self, ctx, name: str):
+        user = await User.get(discord_id=str(ctx.author.id))
+        relic = await relic_inventory.find(user.id, name)
 
         if not relic:
             return await ctx.send("❌ Relic not found.")
@@ -126,13 +157,16 @@ class Relics(commands.Cog):
 
         if tier == -1:
             return await ctx.send("⚠️ Relic must be at least level 30 to awaken.")
-        if user.resonance_crystals < cost[tier]:
+        try:
+            async with in_transaction() as conn:
+                relic = await relic_inventory.transform(relic, using_db=conn, awaken=relic.awaken + 1)
+                if relic:
+                    await economy.spend_or_raise(user.id, using_db=conn, resonance_crystals=cost[tier])
+        except InsufficientFunds:
             return await ctx.send(f"❌ You need {cost[tier]} resonance crystals.")
-
-        relic.awaken += 1
-        user.resonance_crystals -= cost[tier]
-        await user.save()
-        await relic.save()
+        if not relic:
+            return await ctx.send("❌ Relic not found.")
+        await self.refresh_equipped(relic)
         await ctx.send(f"✨ {name} awakened to level {relic.awaken}!")
 
     @commands.command(name="relics")
@@ -140,7 +174,7 @@ class Relics(commands.Cog):
         embed = discord.Embed(
             title="🗡️ Relic Commands",
             description=(
-                "**!relicsummon** - Summon a relic using diamonds\n"
+                "**!relicsummon** - Summon a relic using gems\n"
                 "**!relicupgrade <name>** - Upgrade relic with duplicate\n"
                 "**!relicinherit <from> <to> <quality|awaken>** - Inherit relic traits\n"
                 "**!relicawaken <name>** - Awaken relic using resonance crystals\n"
@@ -152,20 +186,34 @@ class Relics(commands.Cog):
 
     @commands.command(name="myrelics")
     async def my_relics(self, ctx):
-        user = await User.get(discord_id=str(ctx.author.id)).prefetch_related("relics")
-        relics = await user.relics.all()
-        if not relics:
+        embed, view = await RelicView(ctx.author.id).open()
+        if embed is None:
             return await ctx.send("🪨 You don't own any relics yet.")
+        await ctx.send(embed=embed, view=view)
+
+class RelicView(PagedView):
+    """A user's relic stacks by name, a page at a time (Discord caps an embed at 25 fields)."""
+
+    kind = "relics"
+    sorts = ("key",)
+    descending = False
 
+    def queryset(self):
+        return Relic.filter(user__discord_id=str(self.owner_id))
+
+    def render(self, rows, start):
         embed = discord.Embed(title="🧿 Your Relics", color=0x88ccff)
-        for relic in relics:
-            attrs = ", ".join(f"{a['type']} +{a['value']}" for a in relic.attributes)
+        for relic in rows:
+            stats = relic_stats.for_relic(relic)
+            skills = f" ({', '.join(s for s in stats.skills if s)})" if any(stats.skills) else ""
+            copies = f" x{relic.count}" if relic.count > 1 else ""
             embed.add_field(
-                name=f"{relic.quality} ⭐ {relic.name} (Lv{relic.level})",
-                value=f"{attrs or 'No attributes'} | Awaken: {relic.awaken}",
+                name=f"{relic.quality} ⭐ {relic.name} (Lv{relic.level}){copies}",
+                value=f"{stats.summary or 'No attributes'} | Awaken: {relic.awaken}{skills}",
                 inline=False
             )
-        await ctx.send(embed=embed)
+        return embed
 
 async def setup(bot):
+    bot.add_dynamic_items(PageButton)
     await bot.add_cog(Relics(bot))
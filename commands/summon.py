@@ -1,13 +1,16 @@
 import discord
 from discord.ext import commands
-from models import User, Character, CharacterTemplate
-import random
-import asyncio
-import os
+from models import User
+from services import summoning
+from services.announcements import LuckyAnnouncer
+from services.assets import THUMBNAIL, asset_index, assets
+from services.banners import banners
+from services.economy import InsufficientFunds, user_locks
+from services.reveal import RevealManager, split_steps
 import traceback
 
 name = "summon"
-description = "Summon new waifus to join your collection."
+description = "Summon new waifus to join your collection. Usage: !summon [banner] [amount] — see !banners"
 
 SUMMON_COST = 10
 DISCOUNT_THRESHOLD = 10
@@ -16,149 +19,134 @@ class Summon(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.enable_animation_delay = True
+        self.reveals = RevealManager()
+        self.announcer = LuckyAnnouncer(bot)
+
+    async def cog_unload(self):
+        self.reveals.cancel_all()
+        await self.announcer.close()
 
     def get_gold_reward_by_potential(self, potential: int) -> int:
-        thresholds = [
-            (5200, 1500), (5000, 1200), (4500, 920), (4000, 780),
-            (3500, 650), (3000, 500), (2500, 300), (2000, 200),
-            (1500, 100)
-        ]
-        for threshold, reward in thresholds:
-            if potential >= threshold:
-                return reward
-        return 100
+        return summoning.get_gold_reward_by_potential(potential)
 
     def get_rarity(self, potential: int) -> str:
-        if potential >= 5000:
-            return "SSR 🌈✨"
-        elif potential >= 4000:
-            return "SR 🔥"
-        elif potential >= 3000:
-            return "R 🔧"
-        else:
-            return "N 🌿"
+        return summoning.get_rarity(potential)
 
-    @commands.command(name="summon")
-    async def summon(self, ctx, amount: int = 1):
-        user_id = str(ctx.author.id)
+    @commands.command(name="skip")
+    async def skip(self, ctx):
+        if not self.reveals.cancel(ctx.author.id):
+            await ctx.reply("⏭️ You have no summon being revealed.")
 
-        user, _ = await User.get_or_create(discord_id=user_id, defaults={
-            "name": ctx.author.name
-        })
+    @commands.command(name="banners")
+    async def list_banners(self, ctx):
+        await banners.ensure_compiled()
+        user = await User.get_or_none(discord_id=str(ctx.author.id))
+
+        embed = discord.Embed(title="🎪 Active Banners", color=0xFFD700)
+        for banner in banners.all():
+            pity = summoning.get_pity(user, banner) if user else 0
+            value = f"{banner.description}\n`!summon {banner.key} <amount>` • {banner.size} waifus • Pity {pity}/{summoning.PITY_INTERVAL}"
+            embed.add_field(name=banner.name, value=value, inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="summon")
+    async def summon(self, ctx, banner_or_amount: str = None, amount: int = None):
+        banner_key = None
+        if banner_or_amount is None:
+            amount = 1
+        elif banner_or_amount.isdigit():
+            amount = int(banner_or_amount)
+        else:
+            banner_key = banner_or_amount
+            amount = 1 if amount is None else amount
+        if amount < 1:
+            return await ctx.reply("❌ Amount must be at least 1.")
+
+        await banners.ensure_compiled()
+        banner = banners.get(banner_key)
+        if banner is None:
+            if banner_key is None:
+                await ctx.send("⚠️ No character templates found.")
+            else:
+                await ctx.reply(f"❌ Unknown banner `{banner_key}`. Use `!banners` to see what's active.")
+            return
 
+        user_id = str(ctx.author.id)
         total_cost = SUMMON_COST * amount
         if amount % DISCOUNT_THRESHOLD == 0:
             total_cost = int(total_cost * 0.9)
 
-        if user.gems < total_cost:
+        try:
+            # Serialize this user's summons so pity is always read after the previous summon wrote it
+            async with user_locks(ctx.author.id):
+                user, _ = await User.get_or_create(discord_id=user_id, defaults={
+                    "name": ctx.author.name
+                })
+                if user.gems < total_cost:
+                    await ctx.reply(f"❌ You need {total_cost} 💎 to summon {amount} times!")
+                    return
+                outcome = await summoning.summon(user, banner, amount, total_cost)
+        except InsufficientFunds:
             await ctx.reply(f"❌ You need {total_cost} 💎 to summon {amount} times!")
             return
-
-        templates = await CharacterTemplate.all()
-        if not templates:
-            await ctx.send("⚠️ No character templates found.")
+        except Exception as e:
+            print(f"Summon failed: {e}")
+            traceback.print_exc()
+            await ctx.send("⚠️ Summon failed, no gems were spent. Please try again.")
             return
 
-        base_weight = 10000
-        weights = [max(base_weight - t.potential, int(base_weight * 0.1)) for t in templates]
-
-        user.gems -= total_cost
-        await user.save()
-
-        new_count = 0
         results = []
         rare_announcements = []
-        total_gold_reward = 0
-        pity_counter = user.summon_count % 20
+        for pull in outcome.results:
+            waifu_name = pull.template.name
+            if pull.is_new:
+                results.append(f"{pull.rarity} **{waifu_name}** (New!) — Potential: {pull.template.potential}")
+            else:
+                results.append(f"🔁 **{waifu_name}** (Duplicate) — +{pull.gold} Gold, XP gained & Boosted Stats!")
+            if pull.is_ssr:
+                rare_announcements.append(f"🎉 {ctx.author.mention} summoned an {pull.rarity}: **{waifu_name}**!")
+
+        new_count = outcome.new_count
+        total_gold_reward = outcome.gold
         file, image_url = None, None
-
-        for _ in range(amount):
-            try:
-                if self.enable_animation_delay and amount > 1:
-                    await asyncio.sleep(1)
-
-                force_ssr = pity_counter >= 19
-                if force_ssr:
-                    ssr_pool = [t for t in templates if t.potential >= 5000]
-                    selected = random.choice(ssr_pool or templates)
-                    pity_counter = 0
-                else:
-                    selected = random.choices(templates, weights=weights, k=1)[0]
-                    pity_counter += 1
-
-                name = selected.name
-                pot = selected.potential
-                rarity = self.get_rarity(pot)
-
-                existing = await Character.filter(owner=user, name=name).first()
-
-                if selected.image_path and os.path.exists(selected.image_path):
-                    file = discord.File(selected.image_path, filename="waifu.webp")
-                    image_url = "attachment://waifu.webp"
-
-                if not existing:
-                    await Character.create(
-                        name=name,
-                        level=1,
-                        atk=50,
-                        hp=500,
-                        crit=5,
-                        exp=0,
-                        owner=user,
-                        potential={"base": pot}
-                    )
-                    new_count += 1
-                    results.append(f"{rarity} **{name}** (New!) — Potential: {pot}")
-                else:
-                    existing.atk += 10
-                    existing.hp += 100
-                    existing.crit = min(existing.crit + 1, 20)
-                    existing.exp += 50
-                    while existing.exp >= existing.level * 100:
-                        existing.exp -= existing.level * 100
-                        existing.level += 1
-                        existing.atk += 20
-                        existing.hp += 200
-                        existing.crit = min(existing.crit + 1, 20)
-                    await existing.save()
-                    gold = self.get_gold_reward_by_potential(pot) // 2
-                    user.gold += gold
-                    await user.save()
-                    total_gold_reward += gold
-                    results.append(f"🔁 **{name}** (Duplicate) — +{gold} Gold, XP gained & Boosted Stats!")
-
-                if rarity.startswith("SSR"):
-                    rare_announcements.append(f"🎉 {ctx.author.mention} summoned an {rarity}: **{name}**!")
-
-                user.summon_count += 1
-                await user.save()
-
-            except Exception as e:
-                print(f"Summon failed: {e}")
-                traceback.print_exc()
-
-        result_text = "\n".join(results)
-        if len(result_text) > 4000:
-            result_text = result_text[:4000].rsplit("\n", 1)[0] + "\n...and more."
-
-        embed = discord.Embed(
-            title=f"🎴 Summon Results ({amount}x)",
-            description=result_text,
-            color=0xFFD700 if new_count > 0 else 0xAAAAAA
-        )
-        embed.set_footer(text=f"💎 Spent: {total_cost} Gems | 📦 New: {new_count} | 💰 Gold Gained: {total_gold_reward}")
-        if image_url:
-            embed.set_thumbnail(url=image_url)
-
-        if file:
-            await ctx.send(embed=embed, file=file)
+        last = outcome.results[-1].template if outcome.results else None
+        image_path = asset_index.resolve("characters", last.name, size=THUMBNAIL) if last else None
+        if image_path:
+            image_url = await assets.url_for(image_path)
+            if not image_url:
+                file = discord.File(image_path, filename="waifu.webp")
+                image_url = "attachment://waifu.webp"
+
+        def build_embed(lines, revealing=False):
+            result_text = "\n".join(lines)
+            if len(result_text) > 4000:
+                result_text = result_text[:4000].rsplit("\n", 1)[0] + "\n...and more."
+
+            embed = discord.Embed(
+                title=f"🎴 {banner.name} Results ({amount}x)",
+                description=result_text,
+                color=0xFFD700 if new_count > 0 else 0xAAAAAA
+            )
+            if revealing:
+                embed.set_footer(text=f"✨ Revealing... {len(lines)}/{amount}")
+            else:
+                embed.set_footer(text=f"💎 Spent: {total_cost} Gems | 📦 New: {new_count} | 💰 Gold Gained: {total_gold_reward}")
+            if image_url:
+                embed.set_thumbnail(url=image_url)
+            return embed
+
+        final_embed = build_embed(results)
+        animate = self.enable_animation_delay and amount > 1 and self.reveals.has_capacity()
+        if animate:
+            steps = split_steps(results)
+            frames = [build_embed(results[:n], revealing=True) for n in steps[:-1]] + [final_embed]
+            message = await ctx.send(embed=frames[0], file=file, view=self.reveals.view_for(ctx.author.id))
+            if not self.reveals.start(ctx.author.id, message, frames):
+                await message.edit(embed=final_embed, view=None)
         else:
-            await ctx.send(embed=embed)
+            await ctx.send(embed=final_embed, file=file)
 
-        log_channel = discord.utils.get(ctx.guild.text_channels, name="lucky-users")
-        if log_channel:
-            for msg in rare_announcements:
-                await log_channel.send(msg)
+        self.announcer.announce(ctx.guild, rare_announcements)
 
 async def setup(bot):
     await bot.add_cog(Summon(bot))
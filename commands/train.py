@@ -3,28 +3,38 @@ description = "Train your waifus to improve their skills."
 
 import discord
 from discord.ext import commands
-from tortoise.exceptions import DoesNotExist
-from models import User, Character
+from models import User
+from services.cooldowns import cooldowns
+from services.economy import user_locks
+from services.matchmaking import matchmaker
+from services.power import refresh_power
 import random
-import time
 
 class Train(commands.Cog):
-    cooldowns = {}
-
     def __init__(self, bot):
         self.bot = bot
         self.cooldown_seconds = 60 * 60 * 1  # 1 hour cooldown
 
+    async def cog_load(self):
+        cooldowns.start()
+
+    async def cog_unload(self):
+        # Other cogs share the service; just make sure our last uses are written
+        await cooldowns.flush()
+
     @commands.command(name='train', help='Train a waifu. Usage: !train or !train <waifu name>')
     async def train(self, ctx, *, waifu_name: str = None):
+        # Same lock as !upgrade and !battle, which also rewrite the waifu's stats
+        async with user_locks(ctx.author.id):
+            await self.run_train(ctx, waifu_name)
+
+    async def run_train(self, ctx, waifu_name=None):
         user_id = str(ctx.author.id)
-        now = time.time()
 
-        # Cooldown check
-        last_train = self.cooldowns.get(user_id, 0)
-        if now - last_train < self.cooldown_seconds:
-            remaining = int((self.cooldown_seconds - (now - last_train)) / 60)
-            return await ctx.reply(f"💤 You need to wait **{remaining} more minutes** before training again.")
+        # Cooldown check first, from memory; it's released again if there turns out to be nothing to train
+        remaining = await cooldowns.check_and_set(user_id, "train", self.cooldown_seconds)
+        if remaining:
+            return await ctx.reply(f"💤 You need to wait **{int(remaining / 60)} more minutes** before training again.")
 
         # Fetch user
         user, _ = await User.get_or_create(discord_id=user_id, defaults={"name": ctx.author.name})
@@ -32,6 +42,7 @@ class Train(commands.Cog):
         # Fetch waifus
         await user.fetch_related("waifus")
         if not user.waifus:
+            cooldowns.reset(user_id, "train")
             return await ctx.reply("❌ You must own at least one waifu to train. Use `!summon` first.")
 
         # Choose waifu
@@ -39,6 +50,7 @@ class Train(commands.Cog):
         if waifu_name:
             waifu = next((w for w in user.waifus if w.name.lower() == waifu_name.lower()), None)
             if not waifu:
+                cooldowns.reset(user_id, "train")
                 return await ctx.reply(f"❌ You haven't claimed any waifu named **{waifu_name}**.")
         else:
             waifu = random.choice(user.waifus)
@@ -64,10 +76,9 @@ class Train(commands.Cog):
             waifu.crit += 1
             leveled_up = True
 
+        refresh_power(waifu)
         await waifu.save()
-
-        # Apply cooldown
-        self.cooldowns[user_id] = now
+        matchmaker.observe(waifu)
 
         # Build embed
         description = f"**+{atk_gain} ATK**, **+{hp_gain} HP**"
@@ -1,7 +1,10 @@
 import discord
 from discord.ext import commands
-from models import User, Character
-from tortoise.exceptions import DoesNotExist
+from models import User
+from services import economy
+from services.economy import user_locks
+from services.matchmaking import matchmaker
+from services.power import refresh_power
 
 name = "upgrade"
 description = "Feed XP to your waifu to level her up! Usage: !upgrade <waifu name> [times]"
@@ -17,73 +20,84 @@ class Upgrade(commands.Cog):
             return
 
         try:
-            user, _ = await User.get_or_create(discord_id=str(ctx.author.id), defaults={"name": ctx.author.name})
-            waifus = await user.waifus.all()
-
-            # Split name and optional repetition count
-            parts = waifu_input.rsplit(" ", 1)
-            waifu_name = parts[0]
-            repeat = 1
-            if len(parts) == 2 and parts[1].isdigit():
-                repeat = min(int(parts[1]), 100)
-
-            waifu = next((w for w in waifus if w.name.lower() == waifu_name.lower()), None)
-            if not waifu:
-                await ctx.send("❌ You haven't claimed this waifu.")
-                return
-
-            xp_gain_per_upgrade = 100
-            total_xp_gained = 0
-            total_gold_used = 0
-            leveled_up = False
-
-            for _ in range(repeat):
-                gold_cost = waifu.level * 100
-                if user.gold < gold_cost:
-                    break
-
-                xp_needed = waifu.level * 100
-                user.gold -= gold_cost
-                total_gold_used += gold_cost
-
-                waifu.exp += xp_gain_per_upgrade
-                total_xp_gained += xp_gain_per_upgrade
-
-                while waifu.exp >= xp_needed:
-                    waifu.exp -= xp_needed
-                    waifu.level += 1
-                    xp_needed = waifu.level * 100
-                    waifu.atk += 20
-                    waifu.hp += 200
-                    waifu.crit = min(waifu.crit + 1, 20)
-                    leveled_up = True
-
-            await user.save()
-            await waifu.save()
-
-            embed = discord.Embed(
-                title=f"📈 Upgraded: {waifu.name}",
-                description=f"{waifu.name} received upgrades up to Level **{waifu.level}**!",
-                color=0xFFD700
-            )
-            embed.add_field(name="🔋 Current XP", value=f"{waifu.exp} / {waifu.level * 100}", inline=True)
-            embed.add_field(name="🗡️ ATK", value=str(waifu.atk), inline=True)
-            embed.add_field(name="❤️ HP", value=str(waifu.hp), inline=True)
-            embed.add_field(name="💥 Crit", value=str(waifu.crit), inline=True)
-            embed.add_field(name="💰 Gold Left", value=f"{user.gold}", inline=True)
-            embed.add_field(name="\u200b", value="\u200b", inline=False)
-            embed.add_field(name="📊 XP Gained", value=f"{total_xp_gained}", inline=True)
-            embed.add_field(name="💸 Gold Used", value=f"{total_gold_used}", inline=True)
-
-            if leveled_up and waifu.level >= 10:
-                embed.add_field(name="✨ Evolution!", value="Your waifu is ready to evolve! (Feature coming soon)", inline=False)
-
-            embed.set_footer(text="Use !upgrade again to level up more waifus!")
-            await ctx.send(embed=embed)
-
+            async with user_locks(ctx.author.id):
+                await self.run_upgrade(ctx, waifu_input)
         except Exception as e:
             print(f"Error in upgrade command: {e}")
             await ctx.send("❌ An error occurred while upgrading your waifu.")
 
+    async def run_upgrade(self, ctx, waifu_input):
+        user, _ = await User.get_or_create(discord_id=str(ctx.author.id), defaults={"name": ctx.author.name})
+        waifus = await user.waifus.all()
+
+        # Split name and optional repetition count
+        parts = waifu_input.rsplit(" ", 1)
+        waifu_name = parts[0]
+        repeat = 1
+        if len(parts) == 2 and parts[1].isdigit():
+            repeat = min(int(parts[1]), 100)
+
+        waifu = next((w for w in waifus if w.name.lower() == waifu_name.lower()), None)
+        if not waifu:
+            await ctx.send("❌ You haven't claimed this waifu.")
+            return
+
+        xp_gain_per_upgrade = 100
+        total_xp_gained = 0
+        total_gold_used = 0
+        leveled_up = False
+
+        gold = user.gold
+        for _ in range(repeat):
+            gold_cost = waifu.level * 100
+            if gold < gold_cost:
+                break
+
+            xp_needed = waifu.level * 100
+            gold -= gold_cost
+            total_gold_used += gold_cost
+
+            waifu.exp += xp_gain_per_upgrade
+            total_xp_gained += xp_gain_per_upgrade
+
+            while waifu.exp >= xp_needed:
+                waifu.exp -= xp_needed
+                waifu.level += 1
+                xp_needed = waifu.level * 100
+                waifu.atk += 20
+                waifu.hp += 200
+                waifu.crit = min(waifu.crit + 1, 20)
+                leveled_up = True
+
+        # Conditional on the balance still covering it, in case gold was spent elsewhere meanwhile
+        if not await economy.spend(user.id, gold=total_gold_used):
+            await ctx.send("❌ You don't have enough gold for that anymore.")
+            return
+        user.gold -= total_gold_used
+
+        refresh_power(waifu)
+        await waifu.save()
+        matchmaker.observe(waifu)
+
+        embed = discord.Embed(
+            title=f"📈 Upgraded: {waifu.name}",
+            description=f"{waifu.name} received upgrades up to Level **{waifu.level}**!",
+            color=0xFFD700
+        )
+        embed.add_field(name="🔋 Current XP", value=f"{waifu.exp} / {waifu.level * 100}", inline=True)
+        embed.add_field(name="🗡️ ATK", value=str(waifu.atk), inline=True)
+        embed.add_field(name="❤️ HP", value=str(waifu.hp), inline=True)
+        embed.add_field(name="💥 Crit", value=str(waifu.crit), inline=True)
+        embed.add_field(name="💰 Gold Left", value=f"{user.gold}", inline=True)
+        embed.add_field(name="\u200b", value="\u200b", inline=False)
+        embed.add_field(name="📊 XP Gained", value=f"{total_xp_gained}", inline=True)
+        embed.add_field(name="💸 Gold Used", value=f"{total_gold_used}", inline=True)
+
+        if leveled_up and waifu.level >= 10:
+            embed.add_field(name="✨ Evolution!", value="Your waifu is ready to evolve! (Feature coming soon)", inline=False)
+
+        embed.set_footer(text="Use !upgrade again to level up more waifus!")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Upgrade(bot))
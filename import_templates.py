@@ -2,6 +2,7 @@ import os
 import json
 from tortoise import Tortoise, run_async
 from models import CharacterTemplate, WeaponTemplate  # Adjust if in different path
+from services.assets import asset_index
 
 CHARACTER_DIR = "characters"
 WEAPON_DIR = "store/weapons"
@@ -20,7 +21,6 @@ async def import_characters():
                 data = json.load(f)
 
             name = data.get("name")
-            folder_prefix = file.replace(".json", "")  # e.g., amaterasu
 
             await CharacterTemplate.get_or_create(
                 name=name,
@@ -34,7 +34,7 @@ async def import_characters():
                     "fate": data.get("fate", []),
                     "gallery": data.get("gallery", []),
                     "categories": data.get("categories", []),
-                    "image_folder": folder_prefix
+                    "image_path": asset_index.resolve("characters", name),
                 }
             )
 
@@ -45,7 +45,6 @@ async def import_weapons():
                 data = json.load(f)
 
             name = data.get("name")
-            image_name = file.replace(".json", ".webp")
 
             await WeaponTemplate.get_or_create(
                 name=name,
@@ -53,12 +52,13 @@ async def import_weapons():
                     "rarity": data.get("rarity", "Common"),
                     "stats": data.get("stats", {}),
                     "description": data.get("description", ""),
-                    "image_path": os.path.join(WEAPON_DIR, image_name)
+                    "image_path": asset_index.resolve("relics", name),
                 }
             )
 
 async def main():
     await init()
+    asset_index.build(asset_index.scan())
     await import_characters()
     await import_weapons()
     await Tortoise.close_connections()
@@ -12,17 +12,22 @@ class User(Model):
     gold = fields.IntField(default=0)
     gems = fields.IntField(default=0)
     affection = fields.IntField(default=0)
+    resonance_crystals = fields.IntField(default=0)  # spent on relic awakening
 
     level = fields.IntField(default=1)
     xp = fields.IntField(default=0)
     summon_count = fields.IntField(default=0)
     pity_counter = fields.IntField(default=0)
+    banner_pity = fields.JSONField(default=dict)  # e.g., {"limited": 7}
 
     # Relationships
     waifus: fields.ReverseRelation["Character"]
     relics: fields.ReverseRelation["Relic"]
     cooldowns: fields.ReverseRelation["Cooldown"]
     unlocks: fields.ReverseRelation["Unlock"]
+    collection: fields.BackwardOneToOneRelation["Collection"]
+    battles: fields.ReverseRelation["BattleHistory"]
+    battle_stats: fields.BackwardOneToOneRelation["BattleStats"]
 
 
 # ────────────────────────────────
@@ -40,10 +45,29 @@ class Character(Model):
 
     potential = fields.JSONField(default=dict)  # e.g., {"luck": 2, "evasion": 1}
 
+    # Denormalized score for "best waifu" / sorting; see services/power.py
+    power = fields.IntField(default=0, index=True)
+    relic_power = fields.IntField(default=0)
+
     # Foreign Keys
     owner = fields.ForeignKeyField("models.User", related_name="waifus")
     relic = fields.ForeignKeyField("models.Relic", null=True, related_name="equipped_to")
 
+    class Meta:
+        # One row per claimed waifu; duplicates level the existing row instead
+        unique_together = (("owner", "name"),)
+        indexes = (("owner", "power"), ("owner", "level"))
+
+
+# ────────────────────────────────
+# 📚 Owned-Collection Bitmap
+# ────────────────────────────────
+class Collection(Model):
+    id = fields.IntField(pk=True)
+    user = fields.OneToOneField("models.User", related_name="collection")
+
+    owned = fields.BinaryField()  # little-endian bitmap, bit N = CharacterTemplate.id N
+
 
 # ────────────────────────────────
 # 🗡️ Relics (Equippable Items)
@@ -51,17 +75,52 @@ class Character(Model):
 class Relic(Model):
     id = fields.IntField(pk=True)
     name = fields.CharField(max_length=100)
+    key = fields.CharField(max_length=100, default="")  # relic_key(name); see services/relic_inventory.py
     quality = fields.CharField(max_length=20)
     attributes = fields.JSONField()  # e.g., {"atk": 10, "crit": 2}
 
     level = fields.IntField(default=1)
     awaken = fields.IntField(default=0)
+    count = fields.IntField(default=1)  # identical copies stacked in this row
     image = fields.CharField(max_length=255, null=True)
 
     # Foreign Keys
     user = fields.ForeignKeyField("models.User", related_name="relics")
     equipped_to: fields.ReverseRelation["Character"]
 
+    class Meta:
+        # One row per distinct relic state; duplicates bump `count` instead
+        unique_together = (("user", "key", "level", "quality", "awaken"),)
+        indexes = (("user", "key"),)
+
+
+# ────────────────────────────────
+# ⚔️ Battle History & Rollups
+# ────────────────────────────────
+class BattleHistory(Model):
+    id = fields.BigIntField(pk=True)
+    user = fields.ForeignKeyField("models.User", related_name="battles")
+
+    waifu_name = fields.CharField(max_length=100)
+    opponent_name = fields.CharField(max_length=100)
+    result = fields.CharField(max_length=4)  # "win", "lose" or "draw"
+    timestamp = fields.DatetimeField(index=True)
+    replay = fields.BinaryField(null=True)  # seed + both fighters' inputs; see services/battle_engine.py
+
+    class Meta:
+        # Serves "latest N for a user" (ORDER BY timestamp DESC scans this index backwards)
+        indexes = (("user", "timestamp"),)
+
+
+class BattleStats(Model):
+    id = fields.IntField(pk=True)
+    user = fields.OneToOneField("models.User", related_name="battle_stats")
+
+    # Totals of history rows that have been rolled up and deleted
+    wins = fields.IntField(default=0)
+    losses = fields.IntField(default=0)
+    draws = fields.IntField(default=0)
+
 
 # ────────────────────────────────
 # ⏳ Cooldown Tracking
@@ -73,6 +132,10 @@ class Cooldown(Model):
     command = fields.CharField(max_length=50)     # e.g., "daily", "summon"
     last_used = fields.DatetimeField()
 
+    class Meta:
+        # One row per command per user; services.cooldowns upserts on it
+        unique_together = (("user", "command"),)
+
 
 # ────────────────────────────────
 # 🔓 Unlocks (Progress Features)
@@ -85,6 +148,17 @@ class Unlock(Model):
     unlocked_at = fields.DatetimeField(auto_now_add=True)
 
 
+# ────────────────────────────────
+# 🖼️ Uploaded Assets (CDN URL Cache)
+# ────────────────────────────────
+class Asset(Model):
+    id = fields.IntField(pk=True)
+    content_hash = fields.CharField(max_length=64, unique=True)  # sha256 of the file
+    filename = fields.CharField(max_length=255)
+    url = fields.TextField()
+    uploaded_at = fields.DatetimeField(auto_now=True)
+
+
 # ────────────────────────────────
 # 🧬 Character Template (Master Data)
 # ────────────────────────────────
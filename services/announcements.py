@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import discord
+
+LUCKY_CHANNEL = "lucky-users"
+FLUSH_WINDOW = 3.0
+MESSAGE_LIMIT = 2000
+
+# Stay well under Discord's global limit of 50 requests per second
+BUCKET_RATE = 5.0
+BUCKET_CAPACITY = 5
+
+
+class TokenBucket:
+    def __init__(self, rate=BUCKET_RATE, capacity=BUCKET_CAPACITY):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def chunk_lines(lines, limit=MESSAGE_LIMIT):
+    chunks, current = [], ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class LuckyAnnouncer:
+    """
+    Buffers SSR announcements per guild and posts them as one combined message per window.
+    The #lucky-users channel id is resolved once per guild and kept fresh from channel events.
+    """
+
+    EVENTS = ("on_guild_channel_create", "on_guild_channel_delete", "on_guild_channel_update")
+
+    def __init__(self, bot, window=FLUSH_WINDOW, bucket=None):
+        self.bot = bot
+        self.window = window
+        self.bucket = bucket or TokenBucket()
+        self.channels = {}  # guild_id -> channel_id, or None when the guild has no such channel
+        self.pending = {}
+        self.flushers = {}
+        for event in self.EVENTS:
+            self.bot.add_listener(getattr(self, event), event)
+
+    async def close(self):
+        for event in self.EVENTS:
+            self.bot.remove_listener(getattr(self, event), event)
+        for task in list(self.flushers.values()):
+            task.cancel()
+        for guild_id in list(self.pending):
+            await self.flush(guild_id)
+
+    # ── channel cache ─────────────────
+    def resolve(self, guild):
+        if guild.id not in self.channels:
+            channel = discord.utils.get(guild.text_channels, name=LUCKY_CHANNEL)
+            self.channels[guild.id] = channel.id if channel else None
+        channel_id = self.channels[guild.id]
+        return guild.get_channel(channel_id) if channel_id else None
+
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, discord.TextChannel) and channel.name == LUCKY_CHANNEL:
+            self.channels[channel.guild.id] = channel.id
+
+    async def on_guild_channel_delete(self, channel):
+        if self.channels.get(channel.guild.id) == channel.id:
+            # Another channel with the same name may still exist; rescan on next use
+            self.channels.pop(channel.guild.id, None)
+
+    async def on_guild_channel_update(self, before, after):
+        if not isinstance(after, discord.TextChannel):
+            return
+        if after.name == LUCKY_CHANNEL:
+            self.channels[after.guild.id] = after.id
+        elif before.name == LUCKY_CHANNEL and self.channels.get(after.guild.id) == after.id:
+            self.channels.pop(after.guild.id, None)
+
+    # ── buffering ─────────────────────
+    def announce(self, guild, messages):
+        if not guild or not messages or self.resolve(guild) is None:
+            return
+        self.pending.setdefault(guild.id, []).extend(messages)
+        if guild.id not in self.flushers:
+            self.flushers[guild.id] = asyncio.create_task(self._flush_later(guild.id))
+
+    async def _flush_later(self, guild_id):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self.flushers.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id):
+        lines = self.pending.pop(guild_id, None)
+        guild = self.bot.get_guild(guild_id)
+        channel = self.resolve(guild) if guild else None
+        if not lines or channel is None:
+            return
+        for chunk in chunk_lines(lines):
+            await self.bucket.acquire()
+            try:
+                await channel.send(chunk)
+            except discord.HTTPException as e:
+                print(f"[WARN] Lucky announcement to {guild_id} failed: {e}")
+                return
@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import weakref
+from urllib.parse import parse_qs, urlparse
+
+import discord
+
+from models import Asset
+from services.catalog import name_key
+
+# Re-upload a little before Discord's signed attachment URLs expire
+EXPIRY_MARGIN = 60 * 60
+
+ASSET_ROOTS = {"characters": "characters", "relics": os.path.join("store", "weapons")}
+IMAGE_EXTENSIONS = (".webp", ".png", ".jpg", ".jpeg")
+# "Ra - 3.webp" is variant 3 of Ra; "Angel Blade.webp" is variant 0 of Angel Blade
+VARIANT_RE = re.compile(r"^(?P<name>.+?) - (?P<variant>\d+)$")
+
+# Downscaled copies made offline by build_variants.py; embeds ask for the smallest one that fits
+VARIANT_DIR = os.path.join("store", "variants")
+MANIFEST_PATH = os.path.join(VARIANT_DIR, "manifest.json")
+THUMBNAIL = 128
+PREVIEW = 512
+VARIANT_SIZES = (THUMBNAIL, PREVIEW)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def url_expiry(url: str):
+    # Signed CDN URLs carry their expiry as a hex unix timestamp in the `ex` parameter
+    ex = parse_qs(urlparse(url).query).get("ex")
+    try:
+        return int(ex[0], 16) if ex else None
+    except ValueError:
+        return None
+
+
+class AssetDelivery:
+    def __init__(self):
+        self.bot = None
+        self.channel_id = 0
+        self.urls = {}    # content hash -> CDN url
+        self.hashes = {}  # path -> (mtime, size, content hash)
+        # One upload lock per content hash, held weakly so it lives exactly as long as someone uses it
+        self.locks = weakref.WeakValueDictionary()
+
+    async def load(self, bot):
+        self.bot = bot
+        # Private channel the bot uploads images to once; embeds then reference the CDN URL
+        self.channel_id = int(os.getenv("ASSET_CHANNEL_ID") or 0)
+        self.urls = {a["content_hash"]: a["url"] for a in await Asset.all().values("content_hash", "url")}
+
+    async def hash_for(self, path: str) -> str:
+        stat = os.stat(path)
+        cached = self.hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        # Variant files and edited sources aren't in the startup index; hash them off the event loop
+        digest = await asyncio.to_thread(file_hash, path)
+        self.hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def fresh(self, url) -> bool:
+        if not url:
+            return False
+        expires = url_expiry(url)
+        return expires is None or expires - EXPIRY_MARGIN > time.time()
+
+    async def url_for(self, path: str):
+        if not path or not os.path.exists(path):
+            return None
+        digest = await self.hash_for(path)
+        url = self.urls.get(digest)
+        if self.fresh(url):
+            return url
+
+        channel = self.bot.get_channel(self.channel_id) if self.bot and self.channel_id else None
+        if channel is None:
+            return None
+
+        lock = self.locks.get(digest)
+        if lock is None:
+            lock = self.locks[digest] = asyncio.Lock()
+        async with lock:
+            url = self.urls.get(digest)
+            if self.fresh(url):
+                return url
+            filename = os.path.basename(path).replace(" ", "_")
+            try:
+                message = await channel.send(file=discord.File(path, filename=filename))
+                url = message.attachments[0].url
+            except (discord.HTTPException, IndexError) as e:
+                print(f"[WARN] Asset upload failed for {path}: {e}")
+                return None
+            self.urls[digest] = url
+            await Asset.update_or_create(content_hash=digest, defaults={"filename": filename, "url": url})
+            return url
+
+    async def attach(self, embed: discord.Embed, path: str, thumbnail=False, filename=None):
+        """
+        Point the embed's image (or thumbnail) at `path`.
+        Returns a discord.File only when the CDN URL is unavailable and the image has to be attached.
+        """
+        url = await self.url_for(path)
+        set_image = embed.set_thumbnail if thumbnail else embed.set_image
+        if url:
+            set_image(url=url)
+            return None
+        if not path or not os.path.exists(path):
+            return None
+        filename = filename or os.path.basename(path).replace(" ", "_")
+        set_image(url=f"attachment://{filename}")
+        return discord.File(path, filename=filename)
+
+
+assets = AssetDelivery()
+
+
+# ────────────────────────────────
+# 🗂️ Startup Asset Index
+# ────────────────────────────────
+class AssetRecord:
+    __slots__ = ("path", "size", "mtime", "hash", "sized")
+
+    def __init__(self, path, size, mtime, digest):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.hash = digest
+        self.sized = ()  # ((longest side, path), ...) ascending, from the variant manifest
+
+    def fit(self, size=None) -> str:
+        """Smallest variant whose longest side covers `size` px, else the original."""
+        if size:
+            for longest, path in self.sized:
+                if longest >= size:
+                    return path
+        return self.path
+
+
+def split_variant(stem):
+    match = VARIANT_RE.match(stem)
+    if match:
+        return name_key(match.group("name")), int(match.group("variant"))
+    return name_key(stem), 0
+
+
+class AssetIndex:
+    """
+    Every image under characters/ and store/weapons/, scanned and hashed once at startup and keyed by
+    (kind, normalized name, variant), so cogs resolve paths without listdir or case-sensitive guesses.
+    """
+
+    def __init__(self, roots=None):
+        self.roots = dict(roots or ASSET_ROOTS)
+        self.records = {}
+        self.variants = {}  # (kind, name) -> sorted variant numbers
+
+    async def load(self):
+        self.build(await asyncio.to_thread(self.scan))
+        self.attach_variants(await asyncio.to_thread(read_manifest))
+        # The delivery cache can reuse these hashes instead of re-reading each file on first send
+        for record in self.records.values():
+            assets.hashes[record.path] = (record.mtime, record.size, record.hash)
+        total = sum(r.size for r in self.records.values())
+        sized = sum(bool(r.sized) for r in self.records.values())
+        print(f"🗂️ Asset index built: {len(self.records)} images, {total / 1024 / 1024:.1f} MiB, {sized} with variants")
+
+    def scan(self):
+        records = {}
+        for kind, directory in self.roots.items():
+            if not os.path.isdir(directory):
+                print(f"[WARN] Asset directory missing: {directory}")
+                continue
+            for file in sorted(os.listdir(directory)):
+                stem, ext = os.path.splitext(file)
+                if ext.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                path = os.path.join(directory, file)
+                stat = os.stat(path)
+                key = (kind, *split_variant(stem))
+                if key in records:
+                    print(f"[WARN] Duplicate asset for {key}: {records[key].path} and {path}")
+                    continue
+                records[key] = AssetRecord(path, stat.st_size, stat.st_mtime, file_hash(path))
+        return records
+
+    def build(self, records):
+        variants = {}
+        for kind, name, variant in records:
+            variants.setdefault((kind, name), []).append(variant)
+        self.records = records
+        self.variants = {key: sorted(v) for key, v in variants.items()}
+
+    def attach_variants(self, manifest):
+        for record in self.records.values():
+            entry = manifest.get(record.path)
+            # A source edited since the last build keeps serving the original until variants are rebuilt
+            if not entry or entry.get("hash") != record.hash:
+                record.sized = ()
+                continue
+            record.sized = tuple(sorted(
+                (max(v["width"], v["height"]), v["path"])
+                for v in entry.get("variants", {}).values() if os.path.exists(v["path"])
+            ))
+
+    def get(self, kind, name, variant=None):
+        """The record for one variant, or with variant=None the lowest one (the portrait)."""
+        key = name_key(name)
+        if variant is None:
+            found = self.variants.get((kind, key))
+            if not found:
+                return None
+            variant = found[0]
+        return self.records.get((kind, key, variant))
+
+    def resolve(self, kind, name, variant=None, size=None):
+        """Path to an image, downscaled to the smallest built variant covering `size` px if given."""
+        record = self.get(kind, name, variant)
+        return record.fit(size) if record else None
+
+    def report(self, expected):
+        """
+        Print what `expected` (an iterable of (kind, name, variant-or-None) tuples) can't find,
+        and which scanned files nothing expects. Returns (missing, orphans).
+        """
+        wanted, missing = set(), []
+        for kind, name, variant in expected:
+            record = self.get(kind, name, variant)
+            if record is None:
+                missing.append((kind, name, variant))
+            else:
+                wanted.add(record.path)
+        orphans = sorted(r.path for r in self.records.values() if r.path not in wanted)
+        if missing:
+            shown = ", ".join(f"{name}{f' #{v}' if v else ''} ({kind})" for kind, name, v in missing[:10])
+            print(f"[WARN] {len(missing)} expected images missing: {shown}{' ...' if len(missing) > 10 else ''}")
+        if orphans:
+            print(f"[WARN] {len(orphans)} images nothing refers to: {', '.join(orphans[:10])}{' ...' if len(orphans) > 10 else ''}")
+        return missing, orphans
+
+
+def read_manifest(path=MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("assets", {})
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not read variant manifest {path}: {e}")
+        return {}
+
+
+def expected_assets(templates, relics):
+    """(kind, name, variant) for every image the catalogs refer to: portraits, gallery outfits, relics."""
+    for template in templates:
+        yield "characters", template.name, None
+        for i in range(1, len(template.gallery or []) + 1):
+            yield "characters", template.name, i
+    for relic in relics:
+        yield "relics", relic.name, 0
+
+
+asset_index = AssetIndex()
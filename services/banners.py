@@ -0,0 +1,101 @@
+import json
+import os
+import random
+
+from services.catalog import AliasTable, catalog, summon_weight
+
+BANNERS_FILE = os.path.join("store", "banners.json")
+STANDARD = "standard"
+
+
+class Banner:
+    """A compiled summon pool. Built once when the banner is defined, never filtered per call."""
+
+    __slots__ = ("key", "name", "description", "featured", "size", "pool", "ssr_pool")
+
+    def __init__(self, key, name, description, entries, weights, pity_weights, featured=()):
+        if not entries:
+            raise ValueError(f"Banner {key!r} has no waifus")
+        self.key = key
+        self.name = name
+        self.description = description
+        self.featured = tuple(featured)
+        self.size = len(entries)
+        self.pool = AliasTable(entries, weights)
+
+        ssr = [(e, w) for e, w in zip(entries, pity_weights) if e.is_ssr]
+        if ssr:
+            self.ssr_pool = AliasTable([e for e, _ in ssr], [w for _, w in ssr])
+        else:
+            self.ssr_pool = self.pool
+
+    def draw(self, rng=random):
+        return self.pool.draw(rng)
+
+    def draw_ssr(self, rng=random):
+        return self.ssr_pool.draw(rng)
+
+
+def compile_banner(config, entries):
+    kind = config.get("type", STANDARD)
+    featured = set()
+    boost = 1
+    if kind == "category":
+        category = config["category"]
+        entries = [e for e in entries if category in (e.categories or [])]
+    elif kind == "rate_up":
+        featured = {name.lower() for name in config.get("featured", [])}
+        boost = config.get("rate_up", 1)
+
+    multipliers = [boost if e.name.lower() in featured else 1 for e in entries]
+    weights = [summon_weight(e.potential) * m for e, m in zip(entries, multipliers)]
+    # Pity picks uniformly among SSRs like the standard pool, with featured SSRs still boosted
+    return Banner(
+        config["key"].lower(), config.get("name", config["key"]), config.get("description", ""),
+        entries, weights, multipliers, [e.name for e in entries if e.name.lower() in featured]
+    )
+
+
+class BannerRegistry:
+    def __init__(self, path=BANNERS_FILE):
+        self.path = path
+        self.banners = {}
+        self.source = None
+
+    def load_config(self):
+        if not os.path.exists(self.path):
+            return [{"key": STANDARD, "name": "🌟 Standard Banner", "type": STANDARD}]
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def compile(self, entries, configs=None):
+        banners = {}
+        for config in configs if configs is not None else self.load_config():
+            try:
+                banner = compile_banner(config, entries)
+            except (KeyError, ValueError) as e:
+                print(f"[WARN] Skipping banner {config.get('key')}: {e}")
+                continue
+            banners[banner.key] = banner
+        # Replace the whole mapping at once; in-flight summons keep the banner object they already hold
+        self.banners = banners
+        self.source = entries
+
+    def define(self, config):
+        banner = compile_banner(config, catalog.entries)
+        self.banners = {**self.banners, banner.key: banner}
+        return banner
+
+    async def ensure_compiled(self):
+        await catalog.ensure_loaded()
+        if self.source is not catalog.entries:
+            self.compile(catalog.entries)
+
+    def get(self, key):
+        return self.banners.get((key or STANDARD).lower())
+
+    def all(self):
+        return list(self.banners.values())
+
+
+banners = BannerRegistry()
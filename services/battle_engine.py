@@ -0,0 +1,297 @@
+import random
+import struct
+import zlib
+
+import numpy as np
+
+from services.catalog import base_potential, catalog
+from services.skills import NO_MODIFIERS, Modifiers
+
+ENGINE_VERSION = 2
+MAX_ROUNDS = 10
+SKILL_EVERY = 3  # each side's signature skill fires on rounds 3, 6 and 9
+BASE_HP = 1000
+CRIT_MULTIPLIER = 1.5
+
+ELEMENT_CHART = {
+    "Fire": "Earth", "Water": "Fire", "Earth": "Lightning",
+    "Lightning": "Water", "Light": "Dark", "Dark": "Light"
+}
+
+
+def elemental_bonus(e1, e2):
+    if e1 == ELEMENT_CHART.get(e2): return -0.1
+    if ELEMENT_CHART.get(e1) == e2: return 0.1
+    return 0
+
+
+class Fighter:
+    """Everything the engine needs to know about one side, detached from the ORM."""
+
+    __slots__ = ("name", "potential", "crit", "element", "atk_boost", "hp_boost", "kit", "fates")
+
+    def __init__(self, name, potential, crit=0, element=None, atk_boost=0, hp_boost=0, kit=None, fates=0):
+        self.name = name
+        self.potential = base_potential(potential)
+        self.crit = crit or 0
+        self.element = element
+        self.atk_boost = atk_boost
+        self.hp_boost = hp_boost
+        self.kit = kit        # SkillKit compiled from the waifu's template, if any
+        self.fates = fates    # bitmask of the kit's fates that are active
+
+    @classmethod
+    def from_waifu(cls, waifu, relic=None, element=None, fates=0):
+        """`relic` is a RelicStats; its percentage bonuses become flat engine boosts."""
+        atk_boost, hp_boost, crit = relic_boosts(waifu.potential, relic)
+        return cls(
+            waifu.name, waifu.potential, (waifu.crit or 0) + crit, element or getattr(waifu, "element", None),
+            atk_boost, hp_boost, kit_for(waifu.name), fates,
+        )
+
+    @property
+    def mods(self):
+        return self.kit.modifiers(self.fates) if self.kit else NO_MODIFIERS
+
+    @property
+    def max_hp(self):
+        return (BASE_HP + self.potential / 2 + self.hp_boost) * (1 + self.mods.hp)
+
+
+def relic_boosts(potential, relic):
+    if relic is None:
+        return 0, 0, 0
+    potential = base_potential(potential)
+    atk_boost = int((50 + potential * 0.05) * relic.atk / 100)  # 50 is the mean damage roll
+    hp_boost = int((BASE_HP + potential / 2) * relic.hp / 100)
+    return atk_boost, hp_boost, int(relic.crit)
+
+
+def kit_for(name):
+    entry = catalog.get(name) if name else None
+    return entry.kit if entry else None
+
+
+class Round:
+    __slots__ = ("number", "dmg1", "crit1", "hp1", "dmg2", "crit2", "hp2")
+
+    def __init__(self, number, dmg1, crit1, hp1, dmg2, crit2, hp2):
+        self.number = number
+        self.dmg1, self.crit1, self.hp1 = dmg1, crit1, hp1
+        self.dmg2, self.crit2, self.hp2 = dmg2, crit2, hp2
+
+
+class BattleResult:
+    __slots__ = ("seed", "rounds", "hp1", "hp2", "max_hp1", "max_hp2", "outcome")
+
+    def __init__(self, seed, rounds, hp1, hp2, max_hp1, max_hp2):
+        self.seed = seed
+        self.rounds = rounds
+        self.hp1, self.hp2 = hp1, hp2
+        self.max_hp1, self.max_hp2 = max_hp1, max_hp2
+        if hp1 <= 0 and hp2 <= 0:
+            self.outcome = "draw"
+        elif hp1 > hp2:
+            self.outcome = "win"
+        else:
+            self.outcome = "lose"
+
+
+def new_seed() -> int:
+    return random.getrandbits(63)
+
+
+def _strike(raw, roll, crit, mods, skill_round, target_hp, target_max):
+    dmg = raw * (1 + mods.atk)
+    is_crit = roll < crit
+    if skill_round:
+        dmg *= mods.skill
+        ratio = target_hp / target_max
+        if mods.below and ratio < mods.below:
+            dmg *= mods.below_mult or 1
+            is_crit = is_crit or bool(mods.below_crit)
+        if mods.above and ratio > mods.above:
+            dmg *= mods.above_mult or 1
+            is_crit = is_crit or bool(mods.above_crit)
+    if is_crit:
+        dmg *= CRIT_MULTIPLIER + mods.crit_dmg
+    return int(dmg), is_crit
+
+
+def fight(f1: Fighter, f2: Fighter, seed=None) -> BattleResult:
+    """Play one battle. The same fighters and seed always produce the same rounds."""
+    seed = new_seed() if seed is None else seed
+    rng = random.Random(seed)
+
+    m1, m2 = f1.mods, f2.mods
+    max_hp1 = hp1 = f1.max_hp
+    max_hp2 = hp2 = f2.max_hp
+    crit_chance1 = (f1.crit + m1.crit) / 100
+    crit_chance2 = (f2.crit + m2.crit) / 100
+    bonus1 = elemental_bonus(f1.element, f2.element)
+    bonus2 = elemental_bonus(f2.element, f1.element)
+    rounds = []
+    round_num = 1
+
+    while hp1 > 0 and hp2 > 0 and round_num <= MAX_ROUNDS:
+        raw1 = rng.uniform(0, 100) + f1.potential * 0.05 + bonus1 * 20 + f1.atk_boost
+        raw2 = rng.uniform(0, 100) + f2.potential * 0.05 + bonus2 * 20 + f2.atk_boost
+        roll1, roll2 = rng.random(), rng.random()
+        skill1 = bool(m1.skill) and round_num % SKILL_EVERY == 0
+        skill2 = bool(m2.skill) and round_num % SKILL_EVERY == 0
+        dmg1, crit1 = _strike(raw1, roll1, crit_chance1, m1, skill1, hp2, max_hp2)
+        dmg2, crit2 = _strike(raw2, roll2, crit_chance2, m2, skill2, hp1, max_hp1)
+        # Reflect bounces part of the damage a fighter takes back at the attacker
+        hp2 -= dmg1 + dmg2 * m1.reflect
+        hp1 -= dmg2 + dmg1 * m2.reflect
+        # Healing only helps a fighter still standing after the exchange
+        if hp1 > 0:
+            hp1 = min(max_hp1, hp1 + dmg1 * (m1.leech + (m1.skill_heal if skill1 else 0)))
+        if hp2 > 0:
+            hp2 = min(max_hp2, hp2 + dmg2 * (m2.leech + (m2.skill_heal if skill2 else 0)))
+        rounds.append(Round(round_num, dmg1, crit1, hp1, dmg2, crit2, hp2))
+        round_num += 1
+
+    return BattleResult(seed, rounds, hp1, hp2, max_hp1, max_hp2)
+
+
+# ────────────────────────────────
+# 📊 Batch Mode (NumPy)
+# ────────────────────────────────
+def _column(fighters, attr, n):
+    if isinstance(fighters, Fighter):
+        return np.full(n, float(getattr(fighters, attr)))
+    return np.array([float(getattr(f, attr)) for f in fighters])
+
+
+def _mods(fighters, n):
+    """Modifiers as a dict of columns, one entry per Modifiers slot."""
+    if isinstance(fighters, Fighter):
+        mods = fighters.mods
+        return {name: np.full(n, float(getattr(mods, name))) for name in mods.__slots__}
+    mods = [f.mods for f in fighters]
+    return {name: np.array([float(getattr(m, name)) for m in mods]) for name in NO_MODIFIERS.__slots__}
+
+
+def _strike_batch(raw, roll, crit, m, skill_round, target_hp, target_max):
+    dmg = raw * (1 + m["atk"])
+    is_crit = roll < crit
+    if skill_round:
+        skill = m["skill"] > 0
+        ratio = target_hp / target_max
+        below = skill & (m["below"] > 0) & (ratio < m["below"])
+        above = skill & (m["above"] > 0) & (ratio > m["above"])
+        dmg = np.where(skill, dmg * m["skill"], dmg)
+        dmg = np.where(below, dmg * np.maximum(m["below_mult"], 1), dmg)
+        dmg = np.where(above, dmg * np.maximum(m["above_mult"], 1), dmg)
+        is_crit |= (below & (m["below_crit"] > 0)) | (above & (m["above_crit"] > 0))
+    # np.trunc matches int() for the (rare) negative damage rolls
+    return np.trunc(np.where(is_crit, dmg * (CRIT_MULTIPLIER + m["crit_dmg"]), dmg))
+
+
+def fight_batch(side1, side2, n=None, seed=None):
+    """
+    Simulate many battles at once. Each side is a Fighter (repeated) or a list of Fighters.
+    Returns an int8 array of outcomes from side 1's view: 1 win, 0 draw, -1 lose.
+    Uses the same formulas as fight(), with NumPy's RNG instead of random.Random.
+    """
+    if n is None:
+        n = len(side1) if not isinstance(side1, Fighter) else len(side2) if not isinstance(side2, Fighter) else 1
+    rng = np.random.default_rng(seed)
+
+    m1, m2 = _mods(side1, n), _mods(side2, n)
+    pot1, pot2 = _column(side1, "potential", n), _column(side2, "potential", n)
+    crit1 = (_column(side1, "crit", n) + m1["crit"]) / 100
+    crit2 = (_column(side2, "crit", n) + m2["crit"]) / 100
+    atk1, atk2 = _column(side1, "atk_boost", n), _column(side2, "atk_boost", n)
+    max_hp1 = hp1 = _column(side1, "max_hp", n)
+    max_hp2 = hp2 = _column(side2, "max_hp", n)
+
+    e1 = [side1.element] * n if isinstance(side1, Fighter) else [f.element for f in side1]
+    e2 = [side2.element] * n if isinstance(side2, Fighter) else [f.element for f in side2]
+    bonus1 = np.array([elemental_bonus(a, b) for a, b in zip(e1, e2)])
+    bonus2 = np.array([elemental_bonus(b, a) for a, b in zip(e1, e2)])
+
+    flat1 = pot1 * 0.05 + bonus1 * 20 + atk1
+    flat2 = pot2 * 0.05 + bonus2 * 20 + atk2
+
+    for round_num in range(1, MAX_ROUNDS + 1):
+        alive = (hp1 > 0) & (hp2 > 0)
+        if not alive.any():
+            break
+        skill_round = round_num % SKILL_EVERY == 0
+        raw1 = rng.uniform(0, 100, n) + flat1
+        raw2 = rng.uniform(0, 100, n) + flat2
+        dmg1 = _strike_batch(raw1, rng.random(n), crit1, m1, skill_round, hp2, max_hp2)
+        dmg2 = _strike_batch(raw2, rng.random(n), crit2, m2, skill_round, hp1, max_hp1)
+        new_hp2 = hp2 - dmg1 - dmg2 * m1["reflect"]
+        new_hp1 = hp1 - dmg2 - dmg1 * m2["reflect"]
+        heal1 = m1["leech"] + (m1["skill_heal"] if skill_round else 0)
+        heal2 = m2["leech"] + (m2["skill_heal"] if skill_round else 0)
+        new_hp1 = np.where(new_hp1 > 0, np.minimum(max_hp1, new_hp1 + dmg1 * heal1), new_hp1)
+        new_hp2 = np.where(new_hp2 > 0, np.minimum(max_hp2, new_hp2 + dmg2 * heal2), new_hp2)
+        hp1 = np.where(alive, new_hp1, hp1)
+        hp2 = np.where(alive, new_hp2, hp2)
+
+    outcome = np.where(hp1 > hp2, 1, -1).astype(np.int8)
+    outcome[(hp1 <= 0) & (hp2 <= 0)] = 0
+    return outcome
+
+
+# ────────────────────────────────
+# 📼 Replays
+# ────────────────────────────────
+# A battle is fully determined by the engine version, the seed and both fighters' inputs,
+# so that is all a replay stores (46 bytes); the rounds are re-run on demand.
+# Skill kits are looked up again by waifu name, so only which fates were active is stored, plus a
+# checksum of the modifiers both kits produced, to catch template or parser changes since the battle.
+ELEMENTS = (None, "Fire", "Water", "Earth", "Lightning", "Light", "Dark")
+REPLAY_HEADER = struct.Struct("<BBQ")   # engine version, flags, seed
+REPLAY_SIDE = struct.Struct("<IHBiiB")  # potential, crit, element index, atk boost, hp boost, fates
+REPLAY_KITS = struct.Struct("<I")       # kit_fingerprint() of both sides, after the sides
+REPLAY_SWAPPED = 1                      # stored on the defender's row: they were side 2
+REPLAY_CHECKED = 2                      # has a kit fingerprint (replays from before it don't)
+
+
+def kit_fingerprint(f1: Fighter, f2: Fighter) -> int:
+    """CRC32 of both sides' combat modifiers, which is everything the engine takes from a kit."""
+    values = [getattr(f.mods, stat) for f in (f1, f2) for stat in Modifiers.__slots__]
+    return zlib.crc32(repr(values).encode())
+
+
+def _pack_side(f: Fighter) -> bytes:
+    element = ELEMENTS.index(f.element) if f.element in ELEMENTS else 0
+    return REPLAY_SIDE.pack(f.potential, f.crit, element, int(f.atk_boost), int(f.hp_boost), f.fates & 0xFF)
+
+
+def pack_replay(f1: Fighter, f2: Fighter, seed: int, swapped=False) -> bytes:
+    flags = REPLAY_CHECKED | (REPLAY_SWAPPED if swapped else 0)
+    return (
+        REPLAY_HEADER.pack(ENGINE_VERSION, flags, seed) + _pack_side(f1) + _pack_side(f2)
+        + REPLAY_KITS.pack(kit_fingerprint(f1, f2))
+    )
+
+
+def unpack_replay(blob: bytes, waifu_name="", opponent_name=""):
+    """
+    Returns (f1, f2, seed) in the original battle order, given the names from the history row's
+    point of view. Raises ValueError for replays from another engine version, or whose skill kits
+    no longer compile to what the battle was fought with.
+    """
+    version, flags, seed = REPLAY_HEADER.unpack_from(blob)
+    if version != ENGINE_VERSION:
+        raise ValueError(f"replay was recorded with engine v{version}, this is v{ENGINE_VERSION}")
+    names = (opponent_name, waifu_name) if flags & REPLAY_SWAPPED else (waifu_name, opponent_name)
+    fighters = []
+    for name, offset in zip(names, (REPLAY_HEADER.size, REPLAY_HEADER.size + REPLAY_SIDE.size)):
+        potential, crit, element, atk_boost, hp_boost, fates = REPLAY_SIDE.unpack_from(blob, offset)
+        fighters.append(Fighter(name, potential, crit, ELEMENTS[element], atk_boost, hp_boost, kit_for(name), fates))
+    if flags & REPLAY_CHECKED:
+        (recorded,) = REPLAY_KITS.unpack_from(blob, REPLAY_HEADER.size + 2 * REPLAY_SIDE.size)
+        if recorded != kit_fingerprint(*fighters):
+            raise ValueError("the waifus' skills have changed since it was recorded")
+    return fighters[0], fighters[1], seed
+
+
+def win_probability(f1: Fighter, f2: Fighter, n=4000, seed=None) -> float:
+    return float((fight_batch(f1, f2, n=n, seed=seed) == 1).mean())
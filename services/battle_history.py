@@ -0,0 +1,165 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from tortoise.expressions import F
+from tortoise.functions import Count
+from tortoise.transactions import in_transaction
+
+from models import BattleHistory, BattleStats
+
+FLUSH_INTERVAL = 0.5
+MAX_PENDING = 500
+MAX_BUFFERED = MAX_PENDING * 10  # rows kept through failed flushes before the oldest are dropped
+MAX_ATTEMPTS = 3  # failed bulk inserts before a batch is retried row by row
+RETENTION = timedelta(days=30)
+ROLLUP_INTERVAL = 60 * 60
+
+RESULT_FIELDS = {"win": "wins", "lose": "losses", "draw": "draws"}
+
+
+class BattleHistoryBuffer:
+    """
+    Write-behind buffer for BattleHistory: battles append in memory and a background task
+    bulk-inserts them every FLUSH_INTERVAL seconds. It also rolls old rows up into BattleStats.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.failures = 0
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.last_rollup = time.monotonic()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def record(self, user, waifu_name, opponent_name, result, timestamp=None, replay=None):
+        self.pending.append(BattleHistory(
+            user_id=user.id,
+            waifu_name=waifu_name,
+            opponent_name=opponent_name,
+            result=result,
+            timestamp=timestamp or datetime.utcnow(),
+            replay=replay,
+        ))
+        if len(self.pending) >= self.max_pending:
+            self.wakeup.set()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await BattleHistory.bulk_create(batch)
+            self.failures = 0
+            return
+        except Exception as e:
+            print(f"[ERROR] Battle history flush failed: {e}")
+            self.failures += 1
+
+        if self.failures >= MAX_ATTEMPTS:
+            # Row by row isolates a row that can never be stored, so it stops holding back the rest
+            self.failures = 0
+            failed = []
+            for row in batch:
+                try:
+                    await row.save()
+                except Exception as e:
+                    failed.append((row, e))
+            if len(failed) < len(batch):
+                for row, e in failed:
+                    print(f"[ERROR] Dropping battle history row for user {row.user_id}: {e}")
+                return
+            # Nothing went in: the database is unreachable, not the rows
+            batch = [row for row, _ in failed]
+
+        # Keep the rows for the next attempt, up to a bound
+        self.pending = batch + self.pending
+        overflow = len(self.pending) - MAX_BUFFERED
+        if overflow > 0:
+            print(f"[ERROR] Battle history buffer full; dropping the {overflow} oldest rows")
+            del self.pending[:overflow]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+            if time.monotonic() - self.last_rollup >= ROLLUP_INTERVAL:
+                self.last_rollup = time.monotonic()
+                try:
+                    await rollup()
+                except Exception as e:
+                    print(f"[ERROR] Battle history rollup failed: {e}")
+
+    async def recent(self, user, limit=5):
+        # Include rows still waiting in the buffer so a report right after a battle shows it
+        buffered = [h for h in reversed(self.pending) if h.user_id == user.id][:limit]
+        stored = await BattleHistory.filter(user_id=user.id).order_by("-timestamp").limit(limit)
+        return sorted(buffered + list(stored), key=lambda h: h.timestamp, reverse=True)[:limit]
+
+    async def totals(self, user):
+        totals = {"win": 0, "lose": 0, "draw": 0}
+        stats = await BattleStats.get_or_none(user_id=user.id)
+        if stats:
+            totals = {"win": stats.wins, "lose": stats.losses, "draw": stats.draws}
+        rows = await (
+            BattleHistory.filter(user_id=user.id)
+            .annotate(n=Count("id"))
+            .group_by("result")
+            .values("result", "n")
+        )
+        for row in rows:
+            totals[row["result"]] = totals.get(row["result"], 0) + row["n"]
+        for h in self.pending:
+            if h.user_id == user.id:
+                totals[h.result] = totals.get(h.result, 0) + 1
+        return totals
+
+
+async def rollup(retention=RETENTION):
+    """Fold history rows older than `retention` into per-user BattleStats counters and delete them."""
+    cutoff = datetime.utcnow() - retention
+    async with in_transaction() as conn:
+        rows = await (
+            BattleHistory.filter(timestamp__lt=cutoff)
+            .using_db(conn)
+            .annotate(n=Count("id"))
+            .group_by("user_id", "result")
+            .values("user_id", "result", "n")
+        )
+        if not rows:
+            return 0
+
+        per_user = {}
+        for row in rows:
+            field = RESULT_FIELDS.get(row["result"])
+            if field:
+                per_user.setdefault(row["user_id"], {})[field] = row["n"]
+
+        for user_id, counts in per_user.items():
+            await BattleStats.get_or_create(user_id=user_id, using_db=conn)
+            await BattleStats.filter(user_id=user_id).using_db(conn).update(
+                **{field: F(field) + n for field, n in counts.items()}
+            )
+        return await BattleHistory.filter(timestamp__lt=cutoff).using_db(conn).delete()
+
+
+history = BattleHistoryBuffer()
@@ -0,0 +1,188 @@
+import random
+import re
+import sys
+
+from models import CharacterTemplate
+from services.skills import compile_kit
+
+BASE_WEIGHT = 10000
+MIN_WEIGHT = int(BASE_WEIGHT * 0.1)
+SSR_POTENTIAL = 5000
+KEY_RE = re.compile(r"[^a-z0-9]+")
+
+
+def name_key(name) -> str:
+    """"Jeanne d'Arc", "jeanne_darc" -> "jeanne darc", so lookups ignore case, spacing and punctuation."""
+    return KEY_RE.sub(" ", str(name).lower().replace("'", "").replace("’", "")).strip()
+
+
+def summon_weight(potential: int) -> int:
+    return max(BASE_WEIGHT - potential, MIN_WEIGHT)
+
+
+def base_potential(value) -> int:
+    # Some character files list potential per quality tier, e.g. {"SSR+": 5200, "UR": 6000}
+    if isinstance(value, dict):
+        value = next((v for v in value.values() if isinstance(v, (int, float))), 0)
+    return int(value or 0)
+
+
+# ────────────────────────────────
+# 🎲 Walker / Vose Alias Table
+# ────────────────────────────────
+class AliasTable:
+    """O(n) build, O(1) weighted draw (Vose's variant of Walker's method)."""
+
+    __slots__ = ("items", "prob", "alias")
+
+    def __init__(self, items, weights):
+        n = len(items)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one item")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("AliasTable weights must sum to a positive value")
+
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # Whatever is left is 1.0 up to float error
+        for i in large + small:
+            prob[i] = 1.0
+            alias[i] = i
+
+        self.items = tuple(items)
+        self.prob = tuple(prob)
+        self.alias = tuple(alias)
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng=random):
+        i = int(rng.random() * len(self.items))
+        if rng.random() < self.prob[i]:
+            return self.items[i]
+        return self.items[self.alias[i]]
+
+    def sample(self, k: int, rng=random):
+        return [self.draw(rng) for _ in range(k)]
+
+
+# ────────────────────────────────
+# 🧬 Compact Template Entry
+# ────────────────────────────────
+class TemplateEntry:
+    """Read-only slice of CharacterTemplate without the long lore text."""
+
+    FIELDS = (
+        "id", "name", "potential", "main_attribute", "exclusive_relic",
+        "active_skills", "passive_skills", "fate", "gallery", "categories", "image_path",
+    )
+
+    __slots__ = FIELDS + ("kit",)
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field))
+        self.kit = None  # compiled SkillKit, filled in by TemplateCatalog.build()
+
+    def __repr__(self):
+        return f"<TemplateEntry {self.name!r} potential={self.potential}>"
+
+    @property
+    def is_ssr(self) -> bool:
+        return self.potential >= SSR_POTENTIAL
+
+
+# ────────────────────────────────
+# 📚 Process-wide Template Catalog
+# ────────────────────────────────
+class TemplateCatalog:
+    def __init__(self):
+        self.entries = ()
+        self.by_name = {}
+        self.pool = None
+        self.ssr_pool = None
+        self.id_mask = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.pool is not None
+
+    async def load(self):
+        rows = await CharacterTemplate.all().order_by("id").values(*TemplateEntry.FIELDS)
+        self.build([TemplateEntry(**row) for row in rows])
+        print(f"📚 Template catalog loaded: {len(self.entries)} templates, ~{self.memory_footprint() // 1024} KiB")
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    def build(self, entries):
+        entries = tuple(entries)
+        if not entries:
+            self.entries, self.by_name, self.pool, self.ssr_pool, self.id_mask = (), {}, None, None, 0
+            return
+
+        pool = AliasTable(entries, [summon_weight(e.potential) for e in entries])
+        ssr = [e for e in entries if e.is_ssr]
+        # Pity falls back to the full pool (uniformly) when there are no SSR templates
+        ssr_pool = AliasTable(ssr or entries, [1] * len(ssr or entries))
+
+        id_mask = 0
+        for e in entries:
+            id_mask |= 1 << e.id
+
+        # Parse skill text once here so battles only read precompiled modifiers
+        ids = {e.name.lower(): e.id for e in entries}
+        for e in entries:
+            e.kit = compile_kit(e)
+            for fate in e.kit.fates:
+                # Angels without a template can't be collected, so they don't block the fate
+                fate.requires = sum(1 << i for i in {ids[a.lower()] for a in fate.angels if a.lower() in ids})
+
+        # Swap everything at once so concurrent summons never see a half-built catalog
+        self.entries, self.by_name, self.pool, self.ssr_pool, self.id_mask = (
+            entries, {e.name.lower(): e for e in entries}, pool, ssr_pool, id_mask
+        )
+
+    def get(self, name: str):
+        return self.by_name.get(name.lower())
+
+    def draw(self, rng=random):
+        return self.pool.draw(rng)
+
+    def draw_ssr(self, rng=random):
+        return self.ssr_pool.draw(rng)
+
+    def memory_footprint(self) -> int:
+        seen = set()
+
+        def size(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            total = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                total += sum(size(k) + size(v) for k, v in obj.items())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                total += sum(size(i) for i in obj)
+            elif hasattr(obj, "__slots__"):
+                total += sum(size(getattr(obj, s)) for s in obj.__slots__ if hasattr(obj, s))
+            return total
+
+        return size(self.entries) + size(self.by_name) + size(self.pool) + size(self.ssr_pool)
+
+
+catalog = TemplateCatalog()
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+from tortoise.functions import Count
+from tortoise.transactions import in_transaction
+
+from models import Character, Collection
+from services.catalog import catalog
+from services.power import refresh_power
+
+MAX_CACHED_USERS = 5000
+
+
+def to_bits(owned: bytes) -> int:
+    return int.from_bytes(owned or b"", "little")
+
+
+def to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def owns(bits: int, template_id: int) -> bool:
+    return (bits >> template_id) & 1 == 1
+
+
+class CollectionIndex:
+    """
+    Per-user bitmap of owned CharacterTemplate ids, stored in Collection and kept in an LRU cache.
+    Missing rows are hydrated lazily from the user's Character names.
+    """
+
+    def __init__(self, max_users=MAX_CACHED_USERS):
+        self.max_users = max_users
+        self.cache = OrderedDict()
+
+    async def get(self, user) -> Collection:
+        collection = self.cache.get(user.id)
+        if collection is not None:
+            self.cache.move_to_end(user.id)
+            return collection
+
+        collection = await Collection.get_or_none(user_id=user.id)
+        if collection is None:
+            await catalog.ensure_loaded()
+            bits = 0
+            for name in await Character.filter(owner_id=user.id).values_list("name", flat=True):
+                template = catalog.get(name)
+                if template:
+                    bits |= 1 << template.id
+            collection, _ = await Collection.get_or_create(user_id=user.id, defaults={"owned": to_bytes(bits)})
+
+        self.remember(user.id, collection)
+        return collection
+
+    async def bits(self, user) -> int:
+        return to_bits((await self.get(user)).owned)
+
+    def remember(self, user_id, collection):
+        self.cache[user_id] = collection
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.max_users:
+            self.cache.popitem(last=False)
+
+    def forget(self, user_id=None):
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(user_id, None)
+
+    async def add(self, user, template_ids, using_db=None):
+        collection = await self.get(user)
+        bits = to_bits(collection.owned)
+        for template_id in template_ids:
+            bits |= 1 << template_id
+        collection.owned = to_bytes(bits)
+        await collection.save(update_fields=["owned"], using_db=using_db)
+
+    async def completion(self, user):
+        await catalog.ensure_loaded()
+        bits = await self.bits(user)
+        owned = (bits & catalog.id_mask).bit_count()
+        total = len(catalog.entries)
+        return owned, total, (owned / total if total else 0.0)
+
+
+collection_index = CollectionIndex()
+
+
+async def merge_duplicate_waifus():
+    """
+    Fold waifus claimed twice under one owner, from before the (owner, name) unique index, into their
+    highest level/exp row. The kept row takes over a duplicate's relic if it had none.
+    """
+    groups = await (
+        Character.annotate(rows=Count("id")).group_by("owner_id", "name").filter(rows__gt=1).values("owner_id", "name")
+    )
+    for group in groups:
+        async with in_transaction() as conn:
+            keep, *extra = await (
+                Character.filter(owner_id=group["owner_id"], name=group["name"])
+                .using_db(conn).order_by("-level", "-exp", "id")
+            )
+            if keep.relic_id is None:
+                donor = next((w for w in extra if w.relic_id), None)
+                if donor is not None:
+                    keep.relic_id, keep.relic_power = donor.relic_id, donor.relic_power
+                    refresh_power(keep)
+                    await keep.save(update_fields=["relic_id", "relic_power", "power"], using_db=conn)
+            await Character.filter(id__in=[w.id for w in extra]).using_db(conn).delete()
+        collection_index.forget(group["owner_id"])
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from itertools import islice
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from models import Cooldown, User
+
+FLUSH_INTERVAL = 5
+MAX_ENTRIES = 20000
+EVICT_SCAN = 8  # least recently used pairs looked at per eviction
+
+
+def _epoch(value: datetime) -> float:
+    # Stored timestamps are naive UTC, like the rest of the tables
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+async def dedupe_rows():
+    """Keep only the latest Cooldown row per (user, command), so the unique index can go on."""
+    rows = await Cooldown.all().order_by("-last_used", "-id").values_list("id", "user_id", "command")
+    seen, extra = set(), []
+    for row_id, user_id, command in rows:
+        if (user_id, command) in seen:
+            extra.append(row_id)
+        seen.add((user_id, command))
+    if extra:
+        await Cooldown.filter(id__in=extra).delete()
+
+
+class CooldownService:
+    """
+    Per-(user, command) cooldowns shared by every cog, keyed by Discord id so a check needs no User row.
+    The last use of each pair lives in a bounded in-memory cache; the first check for a pair reads its
+    Cooldown row once, and every later check is a dict lookup. New uses are written behind to the
+    Cooldown table by a background task, so cooldowns survive restarts without a query per command.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, max_entries=MAX_ENTRIES):
+        self.interval = interval
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (discord id, command) -> (last used, expires at), epoch seconds
+        self.dirty = {}  # (discord id, command) -> last used, waiting for the next flush
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def _hydrate(self, key, seconds):
+        # A use still waiting for the flush is newer than the row
+        if key in self.dirty:
+            last_used = self.dirty[key]
+        else:
+            discord_id, command = key
+            row = await (
+                Cooldown.filter(user__discord_id=discord_id, command=command).first().values_list("last_used", flat=True)
+            )
+            last_used = _epoch(row) if row else 0.0
+        # Another check may have set the pair while we were reading
+        if key not in self.entries:
+            self._put(key, last_used, last_used + seconds)
+
+    def _put(self, key, last_used, expires):
+        self.entries[key] = (last_used, expires)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        # Drop the first of the few least recently used pairs whose cooldown ran out, else the oldest;
+        # unflushed uses stay in self.dirty, so evicting their pair loses nothing
+        now = time.time()
+        for key, (_, expires) in islice(self.entries.items(), EVICT_SCAN):
+            if expires <= now:
+                del self.entries[key]
+                return
+        self.entries.popitem(last=False)
+
+    async def check_and_set(self, discord_id, command, seconds, now=None) -> float:
+        """
+        Seconds left on the cooldown, or 0 if the command may run, in which case its cooldown starts now.
+        """
+        key = (str(discord_id), command)
+        if key not in self.entries:
+            await self._hydrate(key, seconds)
+        now = time.time() if now is None else now
+        last_used, _ = self.entries[key]
+        remaining = last_used + seconds - now
+        if remaining > 0:
+            self.entries.move_to_end(key)
+            return remaining
+
+        self._put(key, now, now + seconds)
+        self.dirty[key] = now
+        return 0
+
+    def reset(self, discord_id, command):
+        """Clear a cooldown, e.g. when the command failed after check_and_set started it."""
+        key = (str(discord_id), command)
+        self._put(key, 0.0, 0.0)
+        self.dirty[key] = 0.0
+
+    async def flush(self):
+        if not self.dirty:
+            return
+        batch, self.dirty = self.dirty, {}
+        try:
+            user_ids = dict(
+                await User.filter(discord_id__in=list({d for d, _ in batch})).values_list("discord_id", "id")
+            )
+            # Pairs for Discord users without a profile only live in memory
+            rows = [
+                Cooldown(
+                    user_id=user_ids[discord_id],
+                    command=command,
+                    last_used=datetime.fromtimestamp(last_used, timezone.utc).replace(tzinfo=None),
+                )
+                for (discord_id, command), last_used in batch.items() if discord_id in user_ids
+            ]
+            if rows:
+                await Cooldown.bulk_create(rows, on_conflict=["user_id", "command"], update_fields=["last_used"])
+        except Exception as e:
+            # Keep the writes for the next attempt; newer uses recorded meanwhile win
+            print(f"[ERROR] Cooldown flush failed: {e}")
+            self.dirty = {**batch, **self.dirty}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+cooldowns = CooldownService()
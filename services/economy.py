@@ -0,0 +1,97 @@
+import asyncio
+import contextlib
+import weakref
+
+from tortoise.expressions import F
+
+from models import User
+from services.profile_cards import profile_cards
+
+CURRENCIES = ("gold", "gems", "xp", "affection", "resonance_crystals")
+
+
+class InsufficientFunds(Exception):
+    def __init__(self, costs):
+        self.costs = costs
+        super().__init__(", ".join(f"{amount} {currency}" for currency, amount in costs.items()))
+
+
+def _check(fields):
+    unknown = set(fields) - set(CURRENCIES)
+    if unknown:
+        raise ValueError(f"Not a currency: {', '.join(sorted(unknown))}")
+
+
+async def grant(user_id, using_db=None, **deltas):
+    """Add (or with negative deltas, remove) amounts in one UPDATE, without reading the row first."""
+    _check(deltas)
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    await User.filter(id=user_id).using_db(using_db).update(**{k: F(k) + v for k, v in deltas.items()})
+    profile_cards.forget(user_id)
+
+
+async def spend(user_id, using_db=None, extra=None, **costs) -> bool:
+    """
+    Deduct every cost only if the user can afford all of them (UPDATE ... WHERE gems >= cost).
+    `extra` holds other field updates to apply in the same statement. Returns False if nothing changed.
+    """
+    _check(costs)
+    # A negative cost would pass the >= filter and credit the user; grant() is the way to add
+    negative = sorted(k for k, v in costs.items() if v < 0)
+    if negative:
+        raise ValueError(f"Negative cost: {', '.join(negative)}")
+    costs = {k: v for k, v in costs.items() if v}
+    updates = {k: F(k) - v for k, v in costs.items()}
+    updates.update(extra or {})
+    if not updates:
+        return True
+    filters = {f"{k}__gte": v for k, v in costs.items()}
+    if await User.filter(id=user_id, **filters).using_db(using_db).update(**updates) != 1:
+        return False
+    profile_cards.forget(user_id)
+    return True
+
+
+async def spend_or_raise(user_id, using_db=None, extra=None, **costs):
+    if not await spend(user_id, using_db=using_db, extra=extra, **costs):
+        raise InsufficientFunds(costs)
+
+
+async def balance(user_id, *currencies) -> dict:
+    _check(currencies)
+    return await User.filter(id=user_id).first().values(*(currencies or CURRENCIES)) or {}
+
+
+# ────────────────────────────────
+# 🔒 Per-User Command Locks
+# ────────────────────────────────
+class UserLocks:
+    """
+    One asyncio.Lock per user for commands that touch several rows.
+    Locks are held weakly, so only users with a command in flight take up memory.
+    """
+
+    def __init__(self):
+        self.locks = weakref.WeakValueDictionary()
+
+    def __call__(self, user_id) -> asyncio.Lock:
+        lock = self.locks.get(user_id)
+        if lock is None:
+            lock = self.locks[user_id] = asyncio.Lock()
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def many(self, *user_ids):
+        """Hold several users' locks, taken in sorted order so two commands locking the same pair can't deadlock."""
+        async with contextlib.AsyncExitStack() as stack:
+            for user_id in sorted(set(user_ids)):
+                await stack.enter_async_context(self(user_id))
+            yield
+
+    def __len__(self):
+        return len(self.locks)
+
+
+user_locks = UserLocks()
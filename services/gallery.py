@@ -0,0 +1,50 @@
+from services.assets import PREVIEW, asset_index
+from services.catalog import catalog, name_key
+
+
+class GalleryEntry:
+    """A template's outfits as (title, image path or None), resolved once at startup."""
+
+    __slots__ = ("id", "name", "outfits")
+
+    def __init__(self, template_id, name, outfits):
+        self.id = template_id
+        self.name = name
+        self.outfits = tuple(outfits)
+
+    def __len__(self):
+        return len(self.outfits)
+
+
+class GalleryIndex:
+    """Read-only gallery lookup by normalized template name; opening a gallery never touches disk."""
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_id = {}
+
+    def build(self, entries):
+        # Outfit N is the "<name> - N" image in the asset index
+        by_name = {}
+        for entry in entries:
+            key = name_key(entry.name)
+            outfits = [
+                (title, asset_index.resolve("characters", entry.name, i, size=PREVIEW))
+                for i, title in enumerate(entry.gallery or [], start=1)
+            ]
+            if outfits:
+                by_name[key] = GalleryEntry(entry.id, entry.name, outfits)
+        self.by_name = by_name
+        self.by_id = {g.id: g for g in by_name.values()}
+
+    def load(self):
+        self.build(catalog.entries)
+
+    def get(self, name):
+        return self.by_name.get(name_key(name))
+
+    def get_id(self, template_id):
+        return self.by_id.get(template_id)
+
+
+gallery_index = GalleryIndex()
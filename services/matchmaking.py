@@ -0,0 +1,121 @@
+import bisect
+import random
+
+from models import Character, User
+
+# How many of the closest-rated players a random opponent is picked from
+NEAREST = 8
+# Stale snapshots skipped before giving up on finding an opponent
+MAX_ATTEMPTS = 3
+
+
+def rating(waifu) -> int:
+    return waifu.power
+
+
+class DefenceSnapshot:
+    """A user's defence team (their strongest waifu) as last seen by the matchmaker."""
+
+    __slots__ = ("user_id", "character_id", "name", "rating")
+
+    def __init__(self, user_id, character_id, name, rating):
+        self.user_id = user_id
+        self.character_id = character_id
+        self.name = name
+        self.rating = rating
+
+
+class Matchmaker:
+    """
+    Every user with at least one waifu, kept sorted by defence rating.
+    Picking an opponent of similar strength is a bisect plus a small random window.
+    """
+
+    def __init__(self, nearest=NEAREST):
+        self.nearest = nearest
+        self.snapshots = {}  # user_id -> DefenceSnapshot
+        self.ladder = []     # sorted (rating, user_id)
+        self.warm = False
+
+    def __len__(self):
+        return len(self.ladder)
+
+    async def ensure_warm(self):
+        if self.warm:
+            return
+        # One pass at startup; afterwards the index is maintained incrementally
+        rows = await Character.all().values("id", "owner_id", "name", "power")
+        best = {}
+        for row in rows:
+            snap = DefenceSnapshot(row["owner_id"], row["id"], row["name"], row["power"])
+            current = best.get(snap.user_id)
+            if current is None or snap.rating > current.rating:
+                best[snap.user_id] = snap
+        self.snapshots = best
+        self.ladder = sorted((s.rating, s.user_id) for s in best.values())
+        self.warm = True
+
+    def get(self, user_id):
+        return self.snapshots.get(user_id)
+
+    def _remove(self, user_id):
+        snap = self.snapshots.pop(user_id, None)
+        if snap is not None:
+            i = bisect.bisect_left(self.ladder, (snap.rating, user_id))
+            if i < len(self.ladder) and self.ladder[i] == (snap.rating, user_id):
+                del self.ladder[i]
+        return snap
+
+    def improves(self, waifu) -> bool:
+        current = self.snapshots.get(waifu.owner_id)
+        # Waifu stats only ever grow, so the snapshot only moves when another waifu overtakes it
+        return current is None or current.character_id == waifu.id or rating(waifu) > current.rating
+
+    def observe(self, waifu):
+        """Call whenever a waifu's stats change; keeps the owner's snapshot on their best waifu."""
+        if not self.improves(waifu):
+            return
+        user_id = waifu.owner_id
+        score = rating(waifu)
+        self._remove(user_id)
+        snap = DefenceSnapshot(user_id, waifu.id, waifu.name, score)
+        self.snapshots[user_id] = snap
+        bisect.insort(self.ladder, (score, user_id))
+
+    def forget(self, user_id=None):
+        if user_id is None:
+            self.snapshots, self.ladder, self.warm = {}, [], False
+        else:
+            self._remove(user_id)
+
+    def find_opponent(self, user_id, score, rng=random):
+        if not self.ladder:
+            return None
+        i = bisect.bisect_left(self.ladder, (score, -1))
+        lo = max(0, i - self.nearest // 2)
+        hi = min(len(self.ladder), lo + self.nearest + 1)
+        lo = max(0, hi - self.nearest - 1)
+        candidates = [uid for _, uid in self.ladder[lo:hi] if uid != user_id]
+        if not candidates:
+            return None
+        return self.snapshots[rng.choice(candidates)]
+
+    async def load_opponent(self, user_id, score, attempts=MAX_ATTEMPTS):
+        for _ in range(attempts):
+            snap = self.find_opponent(user_id, score)
+            if snap is None:
+                return None, None
+            opponent = await User.get_or_none(id=snap.user_id)
+            waifu = await Character.get_or_none(id=snap.character_id)
+            if opponent is not None and waifu is not None:
+                return opponent, waifu
+            # The snapshot is stale (deleted user or waifu): drop it, re-rank the owner on whatever
+            # waifu they still have, and try another candidate
+            self._remove(snap.user_id)
+            if opponent is not None:
+                best = await Character.filter(owner_id=opponent.id).order_by("-power", "id").first()
+                if best is not None:
+                    self.observe(best)
+        return None, None
+
+matchmaker = Matchmaker()
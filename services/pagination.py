@@ -0,0 +1,157 @@
+import discord
+from tortoise.expressions import Q
+
+from services.views import reject_stranger, stateless_view
+
+PER_PAGE = 10
+
+
+# ────────────────────────────────
+# 🔑 Keyset Pager
+# ────────────────────────────────
+class KeysetPager:
+    """
+    Walks a filtered queryset one page at a time, ordered by `fields` plus id as a tiebreak.
+    Each flip seeks from the edge row of the page the user is leaving (WHERE (power, id) < (...) LIMIT n)
+    instead of an OFFSET, so it costs one indexed query no matter how deep the page is.
+    """
+
+    def __init__(self, queryset, fields, descending=True, per_page=PER_PAGE):
+        self.queryset = queryset
+        self.fields = tuple(fields) + ("id",)
+        self.descending = descending
+        self.per_page = per_page
+
+    async def count(self) -> int:
+        return await self.queryset.count()
+
+    async def key_for(self, row_id):
+        """The sort key of the row with this id, or None if it's gone or no longer matches."""
+        return await self.queryset.filter(id=row_id).first().values_list(*self.fields)
+
+    def _order(self, forward):
+        desc = self.descending == forward
+        return [f"-{f}" if desc else f for f in self.fields]
+
+    def _past(self, key, forward) -> Q:
+        """Rows strictly beyond `key` in the walk direction, as an OR of lexicographic steps."""
+        op = "lt" if self.descending == forward else "gt"
+        condition, equal = None, {}
+        for field, value in zip(self.fields, key):
+            step = Q(**equal, **{f"{field}__{op}": value})
+            condition = step if condition is None else condition | step
+            equal[field] = value
+        return condition
+
+    async def first(self) -> list:
+        return await self.queryset.order_by(*self._order(True)).limit(self.per_page)
+
+    async def seek(self, key, forward=True) -> list:
+        """The page just after (or with forward=False, just before) the row with this key."""
+        rows = await self.queryset.filter(self._past(key, forward)).order_by(*self._order(forward)).limit(self.per_page)
+        return rows if forward else rows[::-1]
+
+
+# ────────────────────────────────
+# 📄 Restart-safe Paged Embeds
+# ────────────────────────────────
+class PageButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    # Trailing text after the id is the sort value older messages carried; it's re-read now
+    template=r"page:(?P<kind>\w+):(?P<owner>\d+):(?P<sort>\w+):(?P<page>\d+):(?P<dir>[fnp]):(?P<total>\d+):(?P<id>\d*)(?::.*)?",
+):
+    """
+    Prev/next/sort button for every PagedView. The custom_id holds the view kind, owner, sort, target page,
+    the id of the edge row to seek from and the total row count, so a click needs no state from the process
+    that sent the message. The edge row's sort value is read back on click rather than stored, since a long
+    value would not fit in the 100-character custom_id.
+    """
+
+    def __init__(self, label, kind, owner_id, sort, page, direction, total, edge=None, style=discord.ButtonStyle.secondary):
+        self.kind, self.owner_id, self.sort, self.page = kind, int(owner_id), sort, int(page)
+        self.direction, self.total = direction, int(total)
+        self.edge = int(edge) if edge else None
+        custom_id = f"page:{kind}:{owner_id}:{sort}:{page}:{direction}:{total}:{self.edge or ''}"
+        assert len(custom_id) <= 100, custom_id
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=custom_id))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        g = match.groupdict()
+        return cls(item.label, g["kind"], g["owner"], g["sort"], g["page"], g["dir"], g["total"], g["id"], item.style)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await reject_stranger(interaction, self.owner_id, "❌ This isn't your list.")
+
+    async def callback(self, interaction: discord.Interaction):
+        view_type = PagedView.registry.get(self.kind)
+        if view_type is None:
+            return await interaction.response.send_message("⚠️ This list is no longer available.", ephemeral=True)
+        view = view_type(self.owner_id, self.sort)
+        embed, components = await view.flip(self.page, self.direction, self.edge, self.total)
+        await interaction.response.edit_message(embed=embed, view=components)
+
+
+class PagedView:
+    """
+    Base for embeds that list a user's rows a page at a time. Subclasses set `kind` and `sorts` and
+    implement queryset() and render(rows, start); they are rebuilt from a PageButton on every click,
+    so no per-message object outlives the command.
+    """
+
+    registry = {}
+    kind = None
+    sorts = ("id",)
+    descending = True
+    per_page = PER_PAGE
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.kind:
+            PagedView.registry[cls.kind] = cls
+
+    def __init__(self, owner_id, sort=None):
+        self.owner_id = int(owner_id)
+        self.sort = sort if sort in self.sorts else self.sorts[0]
+        self.pager = KeysetPager(self.queryset(), (self.sort,), self.descending, self.per_page)
+
+    def queryset(self):
+        raise NotImplementedError
+
+    def render(self, rows, start) -> discord.Embed:
+        raise NotImplementedError
+
+    def extra_buttons(self, total):
+        return ()
+
+    async def open(self, total=None):
+        """First page as (embed, view), or (None, None) if there is nothing to list."""
+        total = await self.pager.count() if total is None else total
+        if not total:
+            return None, None
+        return self.build(0, await self.pager.first(), total)
+
+    async def flip(self, page, direction, edge, total):
+        total = total or await self.pager.count()
+        rows = []
+        key = await self.pager.key_for(edge) if direction != "f" and edge else None
+        if key:
+            rows = await self.pager.seek(key, forward=direction == "n")
+        if not rows:
+            # Sort switch, or the list shrank under us: start over from the top
+            page, rows = 0, await self.pager.first()
+        return self.build(page, rows, total)
+
+    def build(self, page, rows, total):
+        embed = self.render(rows, page * self.per_page + 1)
+        pages = max(1, -(-total // self.per_page))
+        embed.set_footer(text=f"Page {min(page + 1, pages)}/{pages}")
+
+        buttons = []
+        args = (self.kind, self.owner_id, self.sort)
+        if page > 0 and rows:
+            buttons.append(PageButton("◀️ Prev", *args, page - 1, "p", total, rows[0].id))
+        if (page + 1) * self.per_page < total and rows:
+            buttons.append(PageButton("▶️ Next", *args, page + 1, "n", total, rows[-1].id))
+        buttons.extend(self.extra_buttons(total))
+        return embed, stateless_view(*buttons)
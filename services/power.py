@@ -0,0 +1,47 @@
+from models import Character
+from services.battle_engine import relic_boosts
+from services.catalog import base_potential
+from services.relic_stats import relic_stats
+
+
+def stat_power(level, atk, hp, crit) -> int:
+    return level * 50 + atk * 2 + hp // 5 + crit * 10
+
+
+def relic_power(relic, waifu) -> int:
+    atk_boost, hp_boost, crit = relic_boosts(waifu.potential, relic_stats.for_relic(relic, waifu.name))
+    return stat_power(0, atk_boost, hp_boost, crit)
+
+
+def compute_power(waifu) -> int:
+    # relic_power is denormalized onto the waifu when a relic is assigned, so no relic lookup here
+    return (
+        base_potential(waifu.potential)
+        + stat_power(waifu.level, waifu.atk, waifu.hp, waifu.crit)
+        + (waifu.relic_power or 0)
+    )
+
+
+def refresh_power(waifu) -> int:
+    waifu.power = compute_power(waifu)
+    return waifu.power
+
+
+async def best_waifu(user):
+    return await Character.filter(owner=user).order_by("-power", "id").first()
+
+
+async def top_waifus(user, n=3):
+    return await Character.filter(owner=user).order_by("-power", "id").limit(n)
+
+
+async def backfill_power(batch_size=500):
+    """Fill in power for rows created before the column existed. A no-op once everything is scored."""
+    while True:
+        waifus = await Character.filter(power=0).limit(batch_size)
+        if not waifus:
+            return
+        for waifu in waifus:
+            # Never leave a row at 0 or it would be picked up again forever
+            waifu.power = max(compute_power(waifu), 1)
+        await Character.bulk_update(waifus, fields=["power"])
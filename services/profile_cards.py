@@ -0,0 +1,102 @@
+from collections import OrderedDict
+
+from tortoise.expressions import Q, Subquery
+from tortoise.functions import Count, Sum
+from tortoise.signals import post_delete, post_save
+
+from models import Character, Collection, Relic, User
+
+MAX_CACHED_CARDS = 2000
+TOP_WAIFUS = 3
+
+
+async def roster_summary(user) -> dict:
+    """Waifu count, equipped count and total power in one aggregate query over the (owner, power) index."""
+    row = await (
+        Character.filter(owner_id=user.id)
+        .annotate(waifus=Count("id"), equipped=Count("relic_id"), total_power=Sum("power"))
+        .first()
+        .values("waifus", "equipped", "total_power")
+    )
+    return {
+        "waifus": (row or {}).get("waifus") or 0,
+        "equipped": (row or {}).get("equipped") or 0,
+        "total_power": (row or {}).get("total_power") or 0,
+    }
+
+
+async def showcase(user, top=TOP_WAIFUS, equipped=10):
+    """
+    (top waifus, waifus with a relic equipped) by power, with their relics, in one query: the user's top
+    `top` ids (a LIMIT subquery on the (owner, power) index) plus every equipped waifu, cut to the first
+    top + equipped rows. The top waifus of the whole roster lead that set, and it holds at most `top`
+    unequipped rows, so its first `equipped` equipped rows are the strongest equipped overall.
+    """
+    best = Character.filter(owner_id=user.id).order_by("-power", "id").limit(top).values("id")
+    rows = await (
+        Character.filter(Q(id__in=Subquery(best)) | Q(relic_id__isnull=False), owner_id=user.id)
+        .select_related("relic")
+        .order_by("-power", "id")
+        .limit(top + equipped)
+    )
+    return rows[:top], [w for w in rows if w.relic_id][:equipped]
+
+
+class ProfileCards:
+    """
+    Rendered !profile embeds (as dicts) per user, in an LRU.
+    Instance saves and deletes of a user's rows drop the card through the model signals below;
+    code that writes with queryset updates or bulk operations calls forget() itself.
+    """
+
+    def __init__(self, max_users=MAX_CACHED_CARDS):
+        self.max_users = max_users
+        self.cards = OrderedDict()  # user id -> (discord id, card)
+        self.by_discord = {}
+
+    def get(self, discord_id):
+        user_id = self.by_discord.get(str(discord_id))
+        if user_id is None:
+            return None
+        self.cards.move_to_end(user_id)
+        return self.cards[user_id][1]
+
+    def put(self, user, card):
+        self.forget(user.id)
+        self.cards[user.id] = (user.discord_id, card)
+        self.by_discord[user.discord_id] = user.id
+        while len(self.cards) > self.max_users:
+            _, (discord_id, _) = self.cards.popitem(last=False)
+            self.by_discord.pop(discord_id, None)
+
+    def forget(self, user_id=None):
+        if user_id is None:
+            self.cards.clear()
+            self.by_discord.clear()
+            return
+        entry = self.cards.pop(user_id, None)
+        if entry is not None:
+            self.by_discord.pop(entry[0], None)
+
+    def __len__(self):
+        return len(self.cards)
+
+
+profile_cards = ProfileCards()
+
+
+@post_save(User)
+async def _user_saved(sender, instance, created, using_db, update_fields):
+    profile_cards.forget(instance.id)
+
+
+@post_save(Character)
+@post_delete(Character)
+async def _waifu_changed(sender, instance, *args, **kwargs):
+    profile_cards.forget(instance.owner_id)
+
+
+@post_save(Relic, Collection)
+@post_delete(Relic, Collection)
+async def _owned_changed(sender, instance, *args, **kwargs):
+    profile_cards.forget(instance.user_id)
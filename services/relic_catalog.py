@@ -0,0 +1,108 @@
+import random
+
+from models import Relic
+from services.catalog import AliasTable
+from services.relic_inventory import relic_key
+from services.relic_stats import RELIC_DIR, read_relic_files, relic_stats
+
+# Share of pulls that land in each rarity pool
+RARITY_WEIGHTS = {"N": 50, "R": 35, "SR": 15}
+DEFAULT_RARITY = "SR"
+
+# Within a pool, relics that can be raised to a higher quality are rarer
+CEILING_WEIGHTS = {"SR+": 4, "SSR+": 3, "UR+5": 2, "UR+5★": 1}
+DEFAULT_CEILING_WEIGHT = 2
+
+
+# ────────────────────────────────
+# 🗡️ Compact Relic Entry
+# ────────────────────────────────
+class RelicTemplate:
+    """What a relic pull needs from a weapon file, without the skill and lore text."""
+
+    __slots__ = ("name", "key", "rarity", "quality", "max_quality", "image", "attributes", "weight")
+
+    def __init__(self, name, data):
+        self.name = name
+        self.key = relic_key(name)
+        # Files disagree on which key holds the starting grade: rarity, quality or initial_quality
+        grade = data.get("rarity") or data.get("initial_quality") or data.get("quality") or DEFAULT_RARITY
+        self.rarity = grade.rstrip("+") if grade.rstrip("+") in RARITY_WEIGHTS else DEFAULT_RARITY
+        self.quality = data.get("quality") or data.get("initial_quality") or grade
+        self.max_quality = data.get("max_quality") or data.get("max_rarity")
+        self.image = data.get("image") or ""
+        self.attributes = data.get("attributes") or []
+        self.weight = CEILING_WEIGHTS.get(self.max_quality, DEFAULT_CEILING_WEIGHT)
+
+    def new_relic(self, user, count=1) -> Relic:
+        """An unsaved level 1 stack, so a multi-pull can go out in one bulk_create."""
+        return Relic(
+            name=self.name, key=self.key, quality=self.quality, attributes=self.attributes, image=self.image,
+            level=1, awaken=0, count=count, user=user,
+        )
+
+    def __repr__(self):
+        return f"<RelicTemplate {self.name!r} {self.rarity}>"
+
+
+# ────────────────────────────────
+# 📦 Process-wide Relic Catalog
+# ────────────────────────────────
+class RelicCatalog:
+    def __init__(self):
+        self.entries = ()
+        self.by_name = {}
+        self.pools = {}
+        self.pool = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.pool is not None
+
+    def load(self, directory=RELIC_DIR):
+        # One pass over store/weapons feeds both the pull pools and the stat tables
+        files = read_relic_files(directory)
+        self.build(RelicTemplate(name, data) for name, data in files)
+        relic_stats.build(files)
+        sizes = ", ".join(f"{rarity} {len(pool)}" for rarity, pool in self.pools.items())
+        print(f"🔮 Relic catalog loaded: {len(self.entries)} relics ({sizes})")
+
+    def build(self, entries):
+        entries = tuple(entries)
+        if not entries:
+            self.entries, self.by_name, self.pools, self.pool = (), {}, {}, None
+            return
+
+        pools = {}
+        for e in entries:
+            pools.setdefault(e.rarity, []).append(e)
+
+        # Rarity weight split across the pool by each relic's own weight, flattened into one O(1) table
+        items, weights = [], []
+        for rarity, members in pools.items():
+            share = RARITY_WEIGHTS[rarity] / sum(e.weight for e in members)
+            for e in members:
+                items.append(e)
+                weights.append(e.weight * share)
+
+        self.entries, self.by_name, self.pools, self.pool = (
+            entries,
+            {e.key: e for e in entries},
+            {rarity: AliasTable(members, [e.weight for e in members]) for rarity, members in pools.items()},
+            AliasTable(items, weights),
+        )
+
+    def get(self, name: str):
+        return self.by_name.get(relic_key(name))
+
+    def draw(self, rng=random) -> RelicTemplate:
+        return self.pool.draw(rng)
+
+    def sample(self, k: int, rng=random) -> list:
+        return self.pool.sample(k, rng)
+
+    def draw_rarity(self, rarity: str, rng=random) -> RelicTemplate:
+        return self.pools[rarity].draw(rng)
+
+
+relic_catalog = RelicCatalog()
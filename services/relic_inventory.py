@@ -0,0 +1,107 @@
+from collections import Counter
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from models import Character, Relic
+from services.catalog import name_key
+from services.profile_cards import profile_cards
+
+STATE_FIELDS = ("level", "quality", "awaken")
+
+# "Cretan's  Maze" -> "cretans maze"
+relic_key = name_key
+
+
+async def find(user_id, name, min_count=1, using_db=None):
+    """The user's highest level/awaken stack of a relic holding at least `min_count` copies, or None."""
+    return await (
+        Relic.filter(user_id=user_id, key=relic_key(name), count__gte=min_count)
+        .using_db(using_db)
+        .order_by("-level", "-awaken", "id")
+        .first()
+    )
+
+
+async def deposit(user, templates, using_db=None):
+    """
+    Add a level 1 copy of each RelicTemplate. Stacks the user already has are bumped in place;
+    everything new goes out in one bulk_create, so a 50x pull is one insert at most.
+    """
+    counts = Counter(templates)
+    profile_cards.forget(user.id)
+    existing = {
+        (r.key, r.quality): r
+        for r in await Relic.filter(
+            user_id=user.id, key__in={t.key for t in counts}, level=1, awaken=0
+        ).using_db(using_db)
+    }
+    new = []
+    for template, n in counts.items():
+        stack = existing.get((template.key, template.quality))
+        if stack:
+            await Relic.filter(id=stack.id).using_db(using_db).update(count=F("count") + n)
+        else:
+            new.append(template.new_relic(user, count=n))
+    if new:
+        await Relic.bulk_create(new, using_db=using_db)
+
+
+async def transform(stack, consume=1, using_db=None, **changes):
+    """
+    Take `consume` copies off a stack and add one copy with `changes` (level/quality/awaken) applied.
+    Returns the stack now holding that copy, or None if the stack no longer has enough copies.
+    """
+    if using_db is None:
+        async with in_transaction() as conn:
+            return await transform(stack, consume, conn, **changes)
+
+    profile_cards.forget(stack.user_id)
+    state = {f: changes.get(f, getattr(stack, f)) for f in STATE_FIELDS}
+    target = await Relic.filter(user_id=stack.user_id, key=stack.key, **state).using_db(using_db).first()
+
+    # Using up the whole stack with nowhere to merge: one conditional UPDATE, and equipped waifus keep it
+    if target is None and stack.count == consume:
+        if await Relic.filter(id=stack.id, count=consume).using_db(using_db).update(count=1, **state):
+            for field, value in state.items():
+                setattr(stack, field, value)
+            stack.count = 1
+            return stack
+
+    if not await Relic.filter(id=stack.id, count__gte=consume).using_db(using_db).update(count=F("count") - consume):
+        return None
+    if target:
+        await Relic.filter(id=target.id).using_db(using_db).update(count=F("count") + 1)
+        target.count += 1
+    else:
+        target = await Relic.create(
+            name=stack.name, key=stack.key, attributes=stack.attributes, image=stack.image,
+            user_id=stack.user_id, count=1, using_db=using_db, **state,
+        )
+
+    # An emptied stack hands whoever had it equipped over to the new copy
+    if await Relic.filter(id=stack.id, count=0).using_db(using_db).exists():
+        await Character.filter(relic_id=stack.id).using_db(using_db).update(relic_id=target.id)
+        await Relic.filter(id=stack.id).using_db(using_db).delete()
+    stack.count = max(stack.count - consume, 0)
+    return target
+
+
+async def backfill_stacks(batch_size=500):
+    """Key and merge relic rows created before stacking. A no-op once every row has a key."""
+    while True:
+        relics = await Relic.filter(key="").limit(batch_size)
+        if not relics:
+            return
+        for relic in relics:
+            relic.key = relic_key(relic.name)
+            async with in_transaction() as conn:
+                stack = await Relic.filter(
+                    user_id=relic.user_id, key=relic.key, **{f: getattr(relic, f) for f in STATE_FIELDS}
+                ).using_db(conn).first()
+                if stack:
+                    await Relic.filter(id=stack.id).using_db(conn).update(count=F("count") + relic.count)
+                    await Character.filter(relic_id=relic.id).using_db(conn).update(relic_id=stack.id)
+                    await relic.delete(using_db=conn)
+                else:
+                    await relic.save(update_fields=["key"], using_db=conn)
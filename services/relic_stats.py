@@ -0,0 +1,321 @@
+import json
+import os
+import re
+
+from services.catalog import catalog, name_key
+from services.skills import parse_stats
+
+RELIC_DIR = os.path.join("store", "weapons")
+MAX_LEVEL = 100
+AWAKEN_LEVELS = (30, 60, 90)
+TIERS = len(AWAKEN_LEVELS) + 1
+
+# Stats the battle engine reads from a relic; everything else is only shown to players
+ENGINE_STATS = ("atk", "hp", "crit")
+
+STATIC_BLOCKS = ("static_attribute", "static_attributes", "attributes")
+STATIC_MAX_BLOCKS = ("static_attribute_max", "static_attributes_max", "max_attributes")
+# Every "exclusive*" key holds part of the exclusive bonus: who it is for, what it gives, or both
+EXCLUSIVE_PREFIX = "exclusive"
+# Keys inside an exclusive block that name the character or class it is for
+TARGET_KEYS = ("character", "name", "angel", "class", "target")
+NO_TARGET = {"", "n a", "none", "null"}
+
+# Keys that name the stat of a sibling value, e.g. {"type": "DMG to Mage", "value": "+16%"}
+LABEL_KEYS = ("type", "attribute", "effect", "name", "stat", "description", "target", "base")
+FLAT_STATS = {"spd", "atk_flat", "hp_flat"}
+IGNORED_WORDS = {"max", "base", "min", "value", "initial", "percent", "when", "at", "quality", "up"}
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+STAT_LABELS = {
+    "atk": "ATK", "hp": "HP", "atk_flat": "ATK", "hp_flat": "HP", "crit": "CRIT", "crit_dmg": "Crit DMG", "reflect": "DMG Reflection",
+    "dmg": "DMG", "dmg_reduction": "DMG Reduction", "def": "DEF", "spd": "SPD", "heal": "Heal",
+    "acc": "ACC", "dmg_to_warrior": "DMG to Warrior", "dmg_to_mage": "DMG to Mage", "dmg_to_archer": "DMG to Archer",
+}
+
+
+def read_relic_files(directory=RELIC_DIR) -> list:
+    """[(relic name, parsed JSON)] for every weapon file, in file-name order."""
+    files = []
+    for file in sorted(os.listdir(directory)):
+        if not file.endswith(".json"):
+            continue
+        with open(os.path.join(directory, file), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        files.append((data.get("name") or file[:-5], data))
+    return files
+
+
+def canonical_stat(text):
+    words = [w for w in re.split(r"[\s_:+%()]+", str(text).lower()) if w and w not in IGNORED_WORDS and not NUMBER_RE.fullmatch(w)]
+    name = " ".join(words)
+    for role in ("warrior", "mage", "archer"):
+        if role in words:  # whole words: "damage" contains "mage"
+            return f"dmg_to_{role}"
+    if "crit" in name:
+        return "crit_dmg" if "dmg" in name else "crit"
+    for needle, stat in (
+        ("reflect", "reflect"), ("reduction", "dmg_reduction"), ("dmg", "dmg"), ("damage", "dmg"),
+        ("atk", "atk"), ("hp", "hp"), ("def", "def"), ("spd", "spd"), ("speed", "spd"),
+        ("heal", "heal"), ("acc", "acc"),
+    ):
+        if needle in words or (len(needle) > 3 and needle in name):
+            return stat
+    return None
+
+
+def _numbers(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return [float(value)]
+    return [float(n) for n in NUMBER_RE.findall(str(value))]
+
+
+def _collect(block, side, found, label=None):
+    """Append (stat, side, value) for every number in a loosely structured attribute block."""
+    if isinstance(block, list):
+        for item in block:
+            _collect(item, side, found, label)
+        return
+    if isinstance(block, str):
+        nums = _numbers(block)
+        stat = canonical_stat(block) or label
+        # "12% (45% when Max)"
+        for value, which in zip(nums, (side, "max")):
+            found.append((stat, which, value))
+        return
+    if not isinstance(block, dict):
+        return
+
+    start = len(found)
+    labels = [block[k] for k in LABEL_KEYS if isinstance(block.get(k), str) and not _numbers(block[k])]
+    label = canonical_stat(labels[0]) if labels else label
+    for key, value in block.items():
+        which = "max" if "max" in key.lower() else side
+        if key in LABEL_KEYS and isinstance(value, str) and not _numbers(value):
+            continue
+        if isinstance(value, dict):
+            if {"base", "max"} <= value.keys() or {"min", "max"} <= value.keys():
+                stat = canonical_stat(key) or label
+                found.append((stat, side, _numbers(value.get("base", value.get("min")))[0]))
+                found.append((stat, "max", _numbers(value["max"])[0]))
+            else:
+                _collect(value, which, found, canonical_stat(key) or label)
+        elif isinstance(value, (list, str)):
+            nums = _numbers(value) if isinstance(value, str) else []
+            if isinstance(value, str) and nums:
+                stat = canonical_stat(value) or canonical_stat(key) or label
+                for number, w in zip(nums, (which, "max")):
+                    found.append((stat, w, number))
+            else:
+                _collect(value, which, found, label)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            found.append((canonical_stat(key) or label, which, float(value)))
+
+    # {"HP UP": "12%", "max_value": "45%"}: an unnamed value belongs to the stat named just before it
+    previous = None
+    for i in range(start, len(found)):
+        stat, which, value = found[i]
+        if stat is None and previous is not None:
+            found[i] = (previous, which, value)
+        previous = found[i][0] or previous
+
+
+def parse_ranges(*blocks, max_blocks=()) -> dict:
+    """{"hp_up": {"base": 0.16, "max": 0.6}} -> {"hp": (16.0, 60.0)}. Unrecognised stats are dropped."""
+    found = []
+    for block in blocks:
+        _collect(block, "base", found)
+    for block in max_blocks:
+        _collect(block, "max", found)
+
+    ranges = {}
+    for stat, side, value in found:
+        if stat is None:
+            continue
+        base, top = ranges.get(stat, (None, None))
+        if side == "base" and base is None:
+            base = value
+        elif side == "max" and top is None:
+            top = value
+        ranges[stat] = (base, top)
+
+    result = {}
+    for stat, (base, top) in ranges.items():
+        base = top if base is None else base
+        top = base if top is None else top
+        if top <= 1 and isinstance(base, float):
+            base, top = base * 100, top * 100  # written as fractions, e.g. 0.16
+        if stat in ("atk", "hp") and top > 100:
+            stat = f"{stat}_flat"  # game-scale numbers ("atk": 4000), not a percentage
+        result[stat] = (base, top)
+    return result
+
+
+def _split_exclusive(value, targets, effects):
+    """Sort an exclusive block's pieces into target name keys and effect text/blocks for parse_ranges()."""
+    if isinstance(value, list):
+        for item in value:
+            _split_exclusive(item, targets, effects)
+    elif isinstance(value, str):
+        # "Crit DMG UP +20% (75% when Max)" is an effect; "Main Angel" or "Warrior" is who it's for
+        if _numbers(value):
+            effects.append(value)
+        else:
+            targets.add(name_key(value))
+    elif isinstance(value, dict):
+        rest = {}
+        for key, item in value.items():
+            if key in TARGET_KEYS and not _numbers(item):
+                _split_exclusive(item, targets, effects)
+            elif key[:1].isupper() and isinstance(item, dict):
+                # {"Warrior": {"effect": ..., "base_value": 20}}: the key is the target
+                targets.add(name_key(key))
+                effects.append(item)
+            else:
+                rest[key] = item
+        if rest:
+            effects.append(rest)
+
+
+def parse_exclusive(data):
+    """(target name keys, stat ranges) from every exclusive_* key of a weapon file."""
+    targets, effects = set(), []
+    for key, value in data.items():
+        if key.startswith(EXCLUSIVE_PREFIX) and value:
+            _split_exclusive(value, targets, effects)
+    return frozenset(targets - NO_TARGET), parse_ranges(*effects)
+
+
+def parse_awakenings(data) -> list:
+    """[(level, skill name, {stat: value})] for the 30/60/90 awakening skills."""
+    raw = data.get("awakening_skills") or data.get("awaken_skills") or []
+    if isinstance(raw, dict):
+        raw = [dict(v, level=k) if isinstance(v, dict) else {"level": k, "description": v} for k, v in raw.items()]
+    awakenings = []
+    for skill in raw:
+        if not isinstance(skill, dict) or not str(skill.get("level", "")).isdigit():
+            continue
+        text = re.sub(r"\(.*?\)", "", str(skill.get("description", "")))
+        stats = {}
+        for mod in parse_stats(text.split(":", 1)[-1]):
+            if mod.percent:
+                stats[mod.stat] = stats.get(mod.stat, 0) + mod.value
+        awakenings.append((int(skill["level"]), skill.get("skill_name") or skill.get("name", ""), stats))
+    return sorted(awakenings, key=lambda a: a[0])
+
+
+# ────────────────────────────────
+# 📈 Precomputed Tables
+# ────────────────────────────────
+class RelicStats:
+    """Effective bonuses of one relic template at one (level, awaken tier, exclusive) slot."""
+
+    __slots__ = ("atk", "hp", "crit", "values", "skills", "summary")
+
+    def __init__(self, values, skills):
+        self.values = values
+        self.atk = values.get("atk", 0.0)
+        self.hp = values.get("hp", 0.0)
+        self.crit = values.get("crit", 0.0)
+        self.skills = skills
+        self.summary = ", ".join(
+            f"{STAT_LABELS.get(stat, stat)} +{value:g}{'' if stat in FLAT_STATS else '%'}"
+            for stat, value in values.items() if value
+        )
+
+
+NO_RELIC_STATS = RelicStats({}, ())
+
+
+class RelicTemplateStats:
+    __slots__ = ("name", "static", "exclusive", "targets", "awakenings", "table")
+
+    def __init__(self, name, static, exclusive, awakenings, targets=frozenset()):
+        self.name = name
+        self.static = static
+        self.exclusive = exclusive
+        self.targets = targets  # name keys of the characters and classes the exclusive bonus is for
+        self.awakenings = awakenings
+        self.table = self._build()
+
+    def exclusive_to(self, waifu_name, entry=None) -> bool:
+        """True if the waifu, by name or by one of its template's categories (class), gets the exclusive bonus."""
+        if entry is not None and entry.exclusive_relic and entry.exclusive_relic.lower() == self.name.lower():
+            return True
+        keys = {name_key(waifu_name)}
+        if entry is not None:
+            keys.update(name_key(c) for c in entry.categories or [] if isinstance(c, str))
+        return not self.targets.isdisjoint(keys)
+
+    @staticmethod
+    def index(level, tier, exclusive) -> int:
+        return ((level - 1) * TIERS + tier) * 2 + int(exclusive)
+
+    def _build(self):
+        table, shared = [], {}
+        for level in range(1, MAX_LEVEL + 1):
+            t = (level - 1) / (MAX_LEVEL - 1)
+            for tier in range(TIERS):
+                for exclusive in (False, True):
+                    values = {}
+                    for ranges in (self.static, self.exclusive) if exclusive else (self.static,):
+                        for stat, (base, top) in ranges.items():
+                            values[stat] = values.get(stat, 0) + base + (top - base) * t
+                    skills = []
+                    for _, name, stats in self.awakenings[:tier]:
+                        skills.append(name)
+                        for stat, value in stats.items():
+                            values[stat] = values.get(stat, 0) + value
+                    values = {stat: round(value, 2) for stat, value in values.items()}
+                    # Most slots repeat (flat ranges, no exclusive effect, unused tiers), so share them
+                    key = (tuple(values.items()), tuple(skills))
+                    if key not in shared:
+                        shared[key] = RelicStats(values, tuple(skills))
+                    table.append(shared[key])
+        return tuple(table)
+
+
+class RelicStatTable:
+    """Every relic template's stats for every level/awaken tier, computed once from store/weapons."""
+
+    def __init__(self):
+        self.templates = {}
+
+    def load(self, directory=RELIC_DIR):
+        self.build(read_relic_files(directory))
+
+    def build(self, files):
+        """`files` is [(name, parsed JSON)], so the relic catalog can share one read of store/weapons."""
+        templates, unparsed = {}, []
+        for name, data in files:
+            static = parse_ranges(
+                *(data[k] for k in STATIC_BLOCKS if k in data),
+                max_blocks=[data[k] for k in STATIC_MAX_BLOCKS if k in data],
+            )
+            targets, exclusive = parse_exclusive(data)
+            if targets and not exclusive:
+                unparsed.append(name)
+            templates[name.lower()] = RelicTemplateStats(name, static, exclusive, parse_awakenings(data), targets)
+        self.templates = templates
+        print(f"🗡️ Relic stat tables built: {len(templates)} relics x {MAX_LEVEL} levels x {TIERS} awaken tiers")
+        if unparsed:
+            print(f"[WARN] {len(unparsed)} relics have an exclusive target but no exclusive stats we understand: {', '.join(unparsed)}")
+
+    def get(self, name, level=1, awaken=0, exclusive=False) -> RelicStats:
+        template = self.templates.get(str(name).lower())
+        if template is None:
+            return NO_RELIC_STATS
+        level = min(max(level or 1, 1), MAX_LEVEL)
+        # Awakenings beyond what the level has unlocked don't count yet
+        tier = min(max(awaken or 0, 0), sum(level >= lv for lv in AWAKEN_LEVELS), len(template.awakenings))
+        return template.table[RelicTemplateStats.index(level, tier, exclusive)]
+
+    def for_relic(self, relic, waifu_name=None) -> RelicStats:
+        if relic is None:
+            return NO_RELIC_STATS
+        template = self.templates.get(relic.name.lower())
+        exclusive = bool(waifu_name and template and template.exclusive_to(waifu_name, catalog.get(waifu_name)))
+        return self.get(relic.name, relic.level, relic.awaken, exclusive)
+
+
+relic_stats = RelicStatTable()
@@ -0,0 +1,84 @@
+import asyncio
+
+import discord
+
+MAX_CONCURRENT_REVEALS = 8
+STEP_DELAY = 1.0
+MAX_STEPS = 10
+
+
+class SkipRevealView(discord.ui.View):
+    def __init__(self, manager, user_id):
+        super().__init__(timeout=STEP_DELAY * (MAX_STEPS + 2))
+        self.manager = manager
+        self.user_id = user_id
+
+    @discord.ui.button(label="⏭️ Skip", style=discord.ButtonStyle.secondary)
+    async def skip(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❌ This is not your summon.", ephemeral=True)
+            return
+        await interaction.response.defer()
+        self.manager.cancel(self.user_id)
+
+
+class RevealManager:
+    """
+    Plays summon reveals as background tasks that only edit one message.
+    The summon is already committed when a reveal starts, so nothing here touches the DB.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_REVEALS, step_delay=STEP_DELAY):
+        self.max_concurrent = max_concurrent
+        self.step_delay = step_delay
+        self.tasks = {}
+
+    def has_capacity(self) -> bool:
+        return len(self.tasks) < self.max_concurrent
+
+    def view_for(self, user_id):
+        return SkipRevealView(self, user_id)
+
+    def start(self, user_id, message, frames) -> bool:
+        if len(frames) < 2 or not self.has_capacity():
+            return False
+        # A new summon from the same user supersedes any reveal still running
+        self.cancel(user_id)
+        task = asyncio.create_task(self._play(user_id, message, frames))
+        self.tasks[user_id] = task
+        task.add_done_callback(lambda t: self.tasks.pop(user_id, None) if self.tasks.get(user_id) is t else None)
+        return True
+
+    def cancel(self, user_id) -> bool:
+        task = self.tasks.get(user_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def cancel_all(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    async def _play(self, user_id, message, frames):
+        try:
+            for frame in frames[1:-1]:
+                await asyncio.sleep(self.step_delay)
+                await message.edit(embed=frame)
+            await asyncio.sleep(self.step_delay)
+        except asyncio.CancelledError:
+            pass
+        except discord.HTTPException as e:
+            print(f"[WARN] Summon reveal for {user_id} stopped: {e}")
+        try:
+            await message.edit(embed=frames[-1], view=None)
+        except discord.HTTPException as e:
+            print(f"[WARN] Could not finish summon reveal for {user_id}: {e}")
+
+
+def split_steps(lines, max_steps=MAX_STEPS):
+    """Cumulative reveal points: how many result lines are visible at each step."""
+    steps = min(len(lines), max_steps)
+    if steps == 0:
+        return []
+    return [round(len(lines) * (i + 1) / steps) for i in range(steps)]
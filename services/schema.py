@@ -0,0 +1,101 @@
+from tortoise import Tortoise
+
+from services.collection import merge_duplicate_waifus
+from services.cooldowns import dedupe_rows
+from services.relic_inventory import backfill_stacks
+
+# generate_schemas() only creates missing tables; it never adds columns to tables that already exist,
+# but it does emit CREATE INDEX IF NOT EXISTS for every model index, which fails on a column that isn't
+# there yet. Columns added to existing models are listed here and added by upgrade_schema() before
+# generate_schemas() runs, so a database created from an older models.py catches up, and gets the new
+# indexes, before anything queries it.
+
+# (table, column, type and default); JSON maps to JSONB on Postgres like Tortoise's JSONField
+COLUMNS = (
+    ("user", "banner_pity", "JSON NOT NULL DEFAULT '{}'"),
+    ("user", "resonance_crystals", "INT NOT NULL DEFAULT 0"),
+    ("character", "power", "INT NOT NULL DEFAULT 0"),
+    ("character", "relic_power", "INT NOT NULL DEFAULT 0"),
+    ("relic", "key", "VARCHAR(100) NOT NULL DEFAULT ''"),
+    ("relic", "count", "INT NOT NULL DEFAULT 1"),
+)
+
+# unique_together on an existing table: (table, index name, columns, prepare). `prepare` makes the
+# existing rows unique first (e.g. every pre-stacking relic has key ""), so the index goes on after it,
+# before any command writes. Names match the constraints generate_schemas() puts on fresh tables.
+UNIQUE_INDEXES = (
+    ("character", "uid_character_owner_i_ff896f", ("owner_id", "name"), merge_duplicate_waifus),
+    ("relic", "uid_relic_user_id_3e946c", ("user_id", "key", "level", "quality", "awaken"), backfill_stacks),
+    ("cooldown", "uid_cooldown_user_id_3d82df", ("user_id", "command"), dedupe_rows),
+)
+
+
+def _dialect(conn) -> str:
+    return conn.capabilities.dialect
+
+
+async def existing_columns(conn, table) -> set:
+    if _dialect(conn) == "sqlite":
+        rows = await conn.execute_query_dict(f'PRAGMA table_info("{table}")')
+        return {row["name"] for row in rows}
+    rows = await conn.execute_query_dict(
+        "SELECT column_name FROM information_schema.columns "
+        f"WHERE table_schema = current_schema() AND table_name = '{table}'"
+    )
+    return {row["column_name"] for row in rows}
+
+
+async def add_columns(conn):
+    present = {}
+    for table, column, definition in COLUMNS:
+        if table not in present:
+            present[table] = await existing_columns(conn, table)
+        # A missing table is created whole by generate_schemas()
+        if not present[table] or column in present[table]:
+            continue
+        if _dialect(conn) == "postgres":
+            definition = definition.replace("JSON ", "JSONB ", 1)
+        await conn.execute_script(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}')
+        present[table].add(column)
+        print(f"🛠️ Added column {table}.{column}")
+
+
+async def unique_indexes(conn, table) -> list:
+    """Column sets of the table's unique indexes, including those behind UNIQUE constraints."""
+    if _dialect(conn) == "sqlite":
+        found = []
+        for index in await conn.execute_query_dict(f'PRAGMA index_list("{table}")'):
+            if index["unique"]:
+                rows = await conn.execute_query_dict(f'PRAGMA index_info("{index["name"]}")')
+                found.append({row["name"] for row in rows})
+        return found
+    rows = await conn.execute_query_dict(
+        "SELECT array_agg(a.attname::text) AS columns FROM pg_index i "
+        "JOIN pg_class t ON t.oid = i.indrelid "
+        "JOIN pg_namespace n ON n.oid = t.relnamespace "
+        "JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY(i.indkey) "
+        f"WHERE t.relname = '{table}' AND n.nspname = current_schema() AND i.indisunique "
+        "GROUP BY i.indexrelid"
+    )
+    return [set(row["columns"]) for row in rows]
+
+
+async def add_unique_indexes(conn):
+    for table, name, columns, prepare in UNIQUE_INDEXES:
+        if set(columns) in await unique_indexes(conn, table):
+            continue
+        if prepare is not None:
+            await prepare()
+        fields = ", ".join(f'"{c}"' for c in columns)
+        await conn.execute_script(f'CREATE UNIQUE INDEX "{name}" ON "{table}" ({fields})')
+        print(f"🛠️ Added unique index {name} on {table}")
+
+
+async def upgrade_schema():
+    """Add columns missing from tables created by an older models.py. Run before generate_schemas()."""
+    await add_columns(Tortoise.get_connection("default"))
+
+
+async def upgrade_constraints():
+    """Add unique constraints missing from tables created by an older models.py. Run after generate_schemas()."""
+    await add_unique_indexes(Tortoise.get_connection("default"))
@@ -0,0 +1,250 @@
+import re
+
+# ────────────────────────────────
+# 🧩 Compiled Effects
+# ────────────────────────────────
+# Stats the battle engine understands; everything else (DEF, RES, ACC, ...) is parsed but unused for now
+ENGINE_STATS = ("atk", "hp", "crit", "crit_dmg", "leech", "reflect")
+
+STAT_ALIASES = {
+    "atk": "atk", "atk up": "atk",
+    "hp": "hp", "hp up": "hp", "max hp": "hp",
+    "crit": "crit", "crit probability": "crit",
+    "crit dmg": "crit_dmg", "crit dmg up": "crit_dmg", "p.crit dmg": "crit_dmg", "m.crit dmg": "crit_dmg",
+    "leech": "leech",
+    "dmg reflection": "reflect", "dmg reflects to source": "reflect",
+    "def": "def", "p.res": "p_res", "m.res": "m_res", "debuff res": "debuff_res",
+    "acc": "acc", "effect acc": "effect_acc", "eva": "eva", "increased heal": "heal",
+}
+
+STAT_RE = re.compile(r"^(?P<stat>[a-z .]+?)\s*\+?\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<pct>%?)$")
+REFLECT_RE = re.compile(r"reflects?\s+(\d+(?:\.\d+)?)%")
+DAMAGE_RE = re.compile(r"(\d+(?:\.\d+)?)%\s*(?:p\.|m\.|true\s*)dmg")
+HITS_RE = re.compile(r"(\d+)\s*hits|(?<!up to )(\d+)\s*times|(\d+)\s*random (?:attacks|arrows)")
+TARGET_COUNT_RE = re.compile(r"(\d+)\s*(?:random\s+)?(?:enemies|enemy)")
+CONDITION_RE = re.compile(r"(?:enemy|target)(?:'s|’s)?\s+hp(?:\s+is)?\s*(below|above|<|>)\s*(\d+)%")
+BONUS_RE = re.compile(r"\((\d+)%\s*if target hp\s*<\s*(\d+)%\)")
+HEAL_RE = re.compile(
+    r"self heals by (\d+)%|converts (\d+)% of (?:total )?dmg|(\d+)% of the damage dealt is converted"
+)
+
+TARGET_RULES = (
+    ("lowest hp", "lowest_hp"), ("highest hp", "highest_hp"), ("highest atk", "highest_atk"),
+    ("front row", "front_row"), ("back row", "back_row"), ("random", "random"),
+)
+
+
+class StatModifier:
+    __slots__ = ("stat", "value", "percent")
+
+    def __init__(self, stat, value, percent):
+        self.stat = stat
+        self.value = value
+        self.percent = percent
+
+    def __repr__(self):
+        return f"<StatModifier {self.stat} +{self.value}{'%' if self.percent else ''}>"
+
+
+class Targeting:
+    __slots__ = ("count", "rule")
+
+    def __init__(self, count=1, rule=None):
+        self.count = count
+        self.rule = rule
+
+
+class Condition:
+    """Applies to a skill's hit when the target's HP ratio is below/above `threshold`."""
+
+    __slots__ = ("below", "threshold", "damage_mult", "crit")
+
+    def __init__(self, below, threshold, damage_mult=1.0, crit=False):
+        self.below = below
+        self.threshold = threshold
+        self.damage_mult = damage_mult
+        self.crit = crit
+
+
+class Skill:
+    __slots__ = ("name", "damage", "hits", "targets", "conditions", "heal")
+
+    def __init__(self, name, damage=0.0, hits=1, targets=None, conditions=(), heal=0.0):
+        self.name = name
+        self.damage = damage  # multiplier per hit, e.g. 1.8 for "180% P.DMG"
+        self.hits = hits
+        self.targets = targets or Targeting()
+        self.conditions = tuple(conditions)
+        self.heal = heal      # fraction of damage dealt returned as HP
+
+    @property
+    def total_damage(self) -> float:
+        return self.damage * self.hits
+
+
+class Fate:
+    __slots__ = ("name", "angels", "modifiers", "requires")
+
+    def __init__(self, name, angels, modifiers):
+        self.name = name
+        self.angels = tuple(angels)
+        self.modifiers = tuple(modifiers)
+        self.requires = 0  # CharacterTemplate id bitmask, resolved by the catalog
+
+
+class Modifiers:
+    """Flat per-fighter numbers the engine reads each round; built once per kit and fate combination."""
+
+    __slots__ = (
+        "atk", "hp", "crit", "crit_dmg", "leech", "reflect",
+        "skill", "skill_heal", "below", "below_mult", "below_crit", "above", "above_mult", "above_crit",
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name, 0.0))
+
+
+NO_MODIFIERS = Modifiers()
+
+
+# ────────────────────────────────
+# 🛠️ Parsing
+# ────────────────────────────────
+def parse_stats(text) -> list:
+    """"ATK +8%, CRIT +8%" -> [StatModifier("atk", 8, True), StatModifier("crit", 8, True)]."""
+    mods = []
+    for part in str(text or "").lower().replace("’", "'").split(","):
+        part = part.strip().rstrip(".")
+        if not part:
+            continue
+        reflect = REFLECT_RE.search(part)
+        if reflect and "dmg" in part:
+            mods.append(StatModifier("reflect", float(reflect.group(1)), True))
+            continue
+        match = STAT_RE.match(part)
+        stat = STAT_ALIASES.get(match.group("stat").strip()) if match else None
+        if stat:
+            mods.append(StatModifier(stat, float(match.group("value")), bool(match.group("pct"))))
+    return mods
+
+
+def parse_targets(text) -> Targeting:
+    text = str(text or "").lower()
+    rule = next((r for key, r in TARGET_RULES if key in text), None)
+    if "all enemies" in text:
+        return Targeting(6, rule)
+    count = TARGET_COUNT_RE.search(text)
+    return Targeting(int(count.group(1)) if count else 1, rule)
+
+
+def parse_conditions(effect, damage_text, base_damage) -> list:
+    conditions = []
+    for match in CONDITION_RE.finditer(effect):
+        below = match.group(1) in ("below", "<")
+        tail = effect[max(0, match.start() - 40):match.end() + 40]
+        crit = "crit" in tail
+        mult = 2.0 if "double" in tail else 1.0
+        if crit or mult > 1:
+            conditions.append(Condition(below, int(match.group(2)) / 100, mult, crit))
+    # "280% P.DMG (600% if target HP < 30%)"
+    bonus = BONUS_RE.search(damage_text)
+    if bonus and base_damage:
+        conditions.append(Condition(True, int(bonus.group(2)) / 100, int(bonus.group(1)) / 100 / base_damage))
+    return conditions
+
+
+def parse_skill(raw) -> Skill:
+    if not isinstance(raw, dict):
+        return Skill(str(raw))
+    effect = str(raw.get("effect") or "").lower().replace("\n", " ")
+    damage_text = str(raw.get("damage") or "").lower()
+    targets_text = str(raw.get("targets") or raw.get("target") or "").lower()
+
+    # The damage field adds up ("180% P.DMG + 20% True DMG"); prose lists alternatives, so take the biggest
+    if damage_text:
+        damage = sum(float(d) for d in DAMAGE_RE.findall(damage_text)) / 100
+    else:
+        damage = max((float(d) for d in DAMAGE_RE.findall(effect)), default=0) / 100
+    hits = HITS_RE.search(" ".join((damage_text, targets_text, effect)))
+    hits = int(next(g for g in hits.groups() if g)) if hits else 1
+    heal = HEAL_RE.search(effect)
+    heal = int(next(g for g in heal.groups() if g)) / 100 if heal else 0.0
+
+    return Skill(
+        raw.get("name", ""),
+        damage=damage,
+        hits=hits,
+        targets=parse_targets(targets_text or effect),
+        conditions=parse_conditions(effect, damage_text, damage),
+        heal=heal,
+    )
+
+
+# ────────────────────────────────
+# 🎒 Per-Template Kit
+# ────────────────────────────────
+class SkillKit:
+    """Everything combat-relevant in a template's skill text, parsed once."""
+
+    __slots__ = ("skills", "passives", "fates", "signature", "_modifiers")
+
+    def __init__(self, skills, passives, fates):
+        self.skills = tuple(skills)
+        self.passives = tuple(passives)
+        self.fates = tuple(fates)
+        # The engine fires the hardest-hitting active skill on skill rounds
+        damaging = [s for s in self.skills if s.total_damage > 0]
+        self.signature = max(damaging, key=lambda s: s.total_damage) if damaging else None
+        self._modifiers = {}
+
+    def active_fates(self, owned_bits: int) -> int:
+        """Bitmask of fates whose angels are all in the owner's collection."""
+        mask = 0
+        for i, fate in enumerate(self.fates):
+            if owned_bits & fate.requires == fate.requires:
+                mask |= 1 << i
+        return mask
+
+    def modifiers(self, fates=0) -> Modifiers:
+        cached = self._modifiers.get(fates)
+        if cached is None:
+            cached = self._modifiers[fates] = self._build(fates)
+        return cached
+
+    def _build(self, fates) -> Modifiers:
+        totals = dict.fromkeys(ENGINE_STATS, 0.0)
+        stat_mods = list(self.passives)
+        for i, fate in enumerate(self.fates):
+            if fates & (1 << i):
+                stat_mods.extend(fate.modifiers)
+        for mod in stat_mods:
+            # Flat bonuses ("Max HP +1000") are in the game's stat scale, not the engine's; only % applies
+            if mod.stat in totals and mod.percent:
+                totals[mod.stat] += mod.value
+
+        values = {stat: value / 100 for stat, value in totals.items()}
+        values["crit"] = totals["crit"]  # crit is already in percentage points
+
+        skill = self.signature
+        if skill:
+            values["skill"] = max(skill.total_damage, 1.0)
+            values["skill_heal"] = skill.heal
+            for cond in skill.conditions:
+                side = "below" if cond.below else "above"
+                values[side] = cond.threshold
+                values[f"{side}_mult"] = cond.damage_mult
+                values[f"{side}_crit"] = cond.crit
+        return Modifiers(**values)
+
+
+def compile_kit(entry) -> SkillKit:
+    skills = [parse_skill(s) for s in entry.active_skills or []]
+    passives = []
+    for p in entry.passive_skills or []:
+        passives.extend(parse_stats(p.get("effect") if isinstance(p, dict) else p))
+    fates = [
+        Fate(f.get("fate_name", ""), f.get("angels") or [], parse_stats(f.get("effect")))
+        for f in entry.fate or [] if isinstance(f, dict)
+    ]
+    return SkillKit(skills, passives, fates)
@@ -0,0 +1,175 @@
+import random
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from models import Character
+from services.banners import STANDARD
+from services.collection import collection_index, owns
+from services.economy import spend_or_raise
+from services.matchmaking import matchmaker
+from services.power import refresh_power
+from services.profile_cards import profile_cards
+
+PITY_INTERVAL = 20
+
+DUPLICATE_FIELDS = ("atk", "hp", "crit", "exp", "level", "power")
+
+
+def get_gold_reward_by_potential(potential: int) -> int:
+    thresholds = [
+        (5200, 1500), (5000, 1200), (4500, 920), (4000, 780),
+        (3500, 650), (3000, 500), (2500, 300), (2000, 200),
+        (1500, 100)
+    ]
+    for threshold, reward in thresholds:
+        if potential >= threshold:
+            return reward
+    return 100
+
+
+def get_rarity(potential: int) -> str:
+    if potential >= 5000:
+        return "SSR 🌈✨"
+    elif potential >= 4000:
+        return "SR 🔥"
+    elif potential >= 3000:
+        return "R 🔧"
+    else:
+        return "N 🌿"
+
+
+def roll(banner, amount: int, pity_counter: int, rng=random):
+    """Draw `amount` templates from `banner`, forcing an SSR on every PITY_INTERVAL-th pull."""
+    pulls = []
+    for _ in range(amount):
+        if pity_counter >= PITY_INTERVAL - 1:
+            pulls.append(banner.draw_ssr(rng))
+            pity_counter = 0
+        else:
+            pulls.append(banner.draw(rng))
+            pity_counter += 1
+    return pulls, pity_counter
+
+
+def get_pity(user, banner) -> int:
+    pity = (user.banner_pity or {}).get(banner.key)
+    if pity is None:
+        # Standard pity used to be derived from the total summon count
+        return user.summon_count % PITY_INTERVAL if banner.key == STANDARD else 0
+    return pity
+
+
+def apply_duplicate(waifu: Character):
+    waifu.atk += 10
+    waifu.hp += 100
+    waifu.crit = min(waifu.crit + 1, 20)
+    waifu.exp += 50
+    while waifu.exp >= waifu.level * 100:
+        waifu.exp -= waifu.level * 100
+        waifu.level += 1
+        waifu.atk += 20
+        waifu.hp += 200
+        waifu.crit = min(waifu.crit + 1, 20)
+
+
+class PullResult:
+    __slots__ = ("template", "rarity", "is_new", "gold")
+
+    def __init__(self, template, is_new, gold=0):
+        self.template = template
+        self.rarity = get_rarity(template.potential)
+        self.is_new = is_new
+        self.gold = gold
+
+    @property
+    def is_ssr(self) -> bool:
+        return self.rarity.startswith("SSR")
+
+
+class SummonOutcome:
+    __slots__ = ("results", "new_count", "gold")
+
+    def __init__(self, results):
+        self.results = results
+        self.new_count = sum(1 for r in results if r.is_new)
+        self.gold = sum(r.gold for r in results)
+
+
+async def summon(user, banner, amount: int, cost: int, rng=random) -> SummonOutcome:
+    """
+    Resolve every pull in memory, then persist the whole batch in one transaction:
+    one bulk INSERT, one bulk UPDATE, one user UPDATE and one collection UPDATE.
+    Duplicate detection is a bit test against the cached collection bitmap, so rows are only
+    SELECTed for templates the user already owns.
+    """
+    templates, pity = roll(banner, amount, get_pity(user, banner), rng)
+
+    bits = await collection_index.bits(user)
+    dup_names = {t.name for t in templates if owns(bits, t.id)}
+    owned = {w.name: w for w in await Character.filter(owner=user, name__in=dup_names)} if dup_names else {}
+
+    created, updated, results = [], {}, []
+    for template in templates:
+        waifu = owned.get(template.name)
+        if waifu is None:
+            waifu = Character(
+                name=template.name,
+                level=1,
+                atk=50,
+                hp=500,
+                crit=5,
+                exp=0,
+                owner=user,
+                potential={"base": template.potential}
+            )
+            refresh_power(waifu)
+            owned[template.name] = waifu
+            created.append(waifu)
+            results.append(PullResult(template, is_new=True))
+            continue
+
+        # A template pulled twice in the same batch levels up the pending row in place
+        apply_duplicate(waifu)
+        refresh_power(waifu)
+        if waifu.pk is not None:
+            updated[waifu.pk] = waifu
+        gold = get_gold_reward_by_potential(template.potential) // 2
+        results.append(PullResult(template, is_new=False, gold=gold))
+
+    outcome = SummonOutcome(results)
+    banner_pity = {**(user.banner_pity or {}), banner.key: pity}
+
+    try:
+        async with in_transaction() as conn:
+            # Charge first: if the gems are gone (a concurrent spend), nothing else is written
+            await spend_or_raise(user.id, using_db=conn, gems=cost, extra={
+                "gold": F("gold") + outcome.gold,
+                "summon_count": F("summon_count") + amount,
+                "banner_pity": banner_pity,
+            })
+            if created:
+                # The (owner, name) unique index rejects a racing summon that created the same waifu
+                await Character.bulk_create(created, using_db=conn)
+                await collection_index.add(user, {r.template.id for r in results if r.is_new}, using_db=conn)
+            if updated:
+                await Character.bulk_update(list(updated.values()), fields=DUPLICATE_FIELDS, using_db=conn)
+    except Exception:
+        collection_index.forget(user.id)
+        raise
+    # Bulk writes skip model signals, so drop the cached profile card here
+    profile_cards.forget(user.id)
+
+    user.gems -= cost
+    user.gold += outcome.gold
+    user.summon_count += amount
+    user.banner_pity = banner_pity
+
+    best = max(created + list(updated.values()), key=lambda w: w.power, default=None)
+    if best is not None and matchmaker.improves(best):
+        if best.pk is None:
+            # bulk_create does not return ids; the (owner, name) index makes this lookup cheap
+            best.id = await Character.filter(owner_id=user.id, name=best.name).first().values_list("id", flat=True)
+        matchmaker.observe(best)
+
+    return outcome
@@ -0,0 +1,22 @@
+import discord
+
+
+def stateless_view(*items) -> discord.ui.View:
+    """
+    A View used only as a component layout. It is stopped before sending, so discord.py doesn't keep it
+    per message; clicks are routed to the DynamicItem classes registered with bot.add_dynamic_items(),
+    which rebuild whatever they need from the custom_id. Buttons keep working across restarts.
+    """
+    view = discord.ui.View(timeout=None)
+    for item in items:
+        view.add_item(item)
+    view.stop()
+    return view
+
+
+async def reject_stranger(interaction: discord.Interaction, owner_id: int, message: str) -> bool:
+    """True if the click came from the message's owner; otherwise tell the clicker and return False."""
+    if interaction.user.id == owner_id:
+        return True
+    await interaction.response.send_message(message, ephemeral=True)
+    return False
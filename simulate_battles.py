@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+
+from services.battle_engine import ELEMENT_CHART, Fighter, fight, fight_batch, win_probability
+
+REFERENCE = Fighter("Reference", 4000, crit=10)
+
+
+def benchmark(n=20000, seed=None):
+    f1 = Fighter("A", 4500, crit=12, atk_boost=40)
+    f2 = Fighter("B", 4200, crit=18, hp_boost=150)
+
+    start = time.perf_counter()
+    for i in range(n):
+        fight(f1, f2, seed=i if seed is None else seed + i)
+    single = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    fight_batch(f1, f2, n=n * 10, seed=seed)
+    batch = (time.perf_counter() - start) / (n * 10)
+    return single, batch
+
+
+def sweep_relic_atk(values, n=20000, seed=None):
+    rows = []
+    for atk in values:
+        boosted = Fighter("Boosted", REFERENCE.potential, crit=REFERENCE.crit, atk_boost=atk)
+        rows.append((atk, win_probability(boosted, REFERENCE, n=n, seed=seed)))
+    return rows
+
+
+def sweep_elements(n=20000, seed=None):
+    elements = sorted(ELEMENT_CHART)
+    table = np.zeros((len(elements), len(elements)))
+    for i, e1 in enumerate(elements):
+        for j, e2 in enumerate(elements):
+            f1 = Fighter("A", REFERENCE.potential, crit=REFERENCE.crit, element=e1)
+            f2 = Fighter("B", REFERENCE.potential, crit=REFERENCE.crit, element=e2)
+            table[i, j] = win_probability(f1, f2, n=n, seed=seed)
+    return elements, table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline battle engine benchmark and balance sweeps.")
+    parser.add_argument("mode", choices=["bench", "relics", "elements"], nargs="?", default="bench")
+    parser.add_argument("--battles", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.mode == "bench":
+        single, batch = benchmark(args.battles, args.seed)
+        print(f"⚔️ fight():       {single * 1e6:8.2f} µs/battle")
+        print(f"⚔️ fight_batch(): {batch * 1e6:8.2f} µs/battle ({single / batch:.0f}x faster)")
+    elif args.mode == "relics":
+        print(f"Win rate vs an equal waifu ({REFERENCE.potential} potential, {REFERENCE.crit}% crit) by relic ATK boost")
+        for atk, p in sweep_relic_atk(range(0, 201, 25), args.battles, args.seed):
+            print(f"  +{atk:<4} ATK  {p:6.1%}")
+    else:
+        elements, table = sweep_elements(args.battles, args.seed)
+        print("Row element's win rate against column element")
+        print(" " * 10 + "".join(f"{e:>10}" for e in elements))
+        for e, row in zip(elements, table):
+            print(f"{e:<10}" + "".join(f"{p:>10.1%}" for p in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from services.catalog import SSR_POTENTIAL, AliasTable, TemplateEntry, base_potential, summon_weight
+from services.summoning import PITY_INTERVAL, get_gold_reward_by_potential, get_rarity
+
+CHARACTER_DIR = "characters"
+GEMS_PER_PULL = 9  # 10 💎 per pull with the 10x discount
+
+
+def load_templates(directory=CHARACTER_DIR):
+    templates = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        templates.append(TemplateEntry(id=len(templates), name=data["name"], potential=base_potential(data.get("potential"))))
+    return templates
+
+
+# ────────────────────────────────
+# 🎲 Samplers (all draw template indices)
+# ────────────────────────────────
+def numpy_alias(weights):
+    table = AliasTable(range(len(weights)), weights)
+    prob = np.asarray(table.prob)
+    alias = np.asarray(table.alias)
+
+    def sample(rng, n):
+        i = rng.integers(0, len(prob), size=n)
+        return np.where(rng.random(n) < prob[i], i, alias[i])
+
+    return sample
+
+
+def numpy_inverse_cdf(weights):
+    cdf = np.cumsum(weights, dtype=np.float64)
+    cdf /= cdf[-1]
+
+    def sample(rng, n):
+        return np.minimum(np.searchsorted(cdf, rng.random(n), side="right"), len(cdf) - 1)
+
+    return sample
+
+
+def python_alias(weights):
+    table = AliasTable(range(len(weights)), weights)
+    return lambda rng, n: np.fromiter((table.draw(rng) for _ in range(n)), dtype=np.int64, count=n)
+
+
+def python_choices(weights):
+    population = range(len(weights))
+    return lambda rng, n: np.fromiter((rng.choices(population, weights=weights, k=1)[0] for _ in range(n)), dtype=np.int64, count=n)
+
+
+SAMPLERS = {
+    "numpy-alias": numpy_alias,
+    "numpy-cdf": numpy_inverse_cdf,
+    "python-alias": python_alias,
+    "python-choices": python_choices,
+}
+
+
+def sampler_rng(sampler, seed=None):
+    if sampler.startswith("numpy"):
+        return np.random.default_rng(seed)
+    return random.Random(seed)
+
+
+# ────────────────────────────────
+# 📊 Monte-Carlo Simulation
+# ────────────────────────────────
+def simulate(templates, players=10000, pulls_per_player=200, seed=None, sampler="numpy-alias"):
+    """
+    Simulate `players` fresh accounts doing `pulls_per_player` pulls each.
+    Pity is positional (every PITY_INTERVAL-th pull of an account), exactly as in Summon.summon.
+    """
+    rng = np.random.default_rng(seed)
+    potentials = np.array([t.potential for t in templates])
+    weights = [summon_weight(p) for p in potentials]
+    ssr_ids = np.flatnonzero(potentials >= SSR_POTENTIAL)
+    if len(ssr_ids) == 0:
+        ssr_ids = np.arange(len(templates))
+
+    draw = SAMPLERS[sampler](weights)
+    draws = draw(sampler_rng(sampler, seed), players * pulls_per_player).reshape(players, pulls_per_player)
+    natural_ssr = potentials[draws] >= SSR_POTENTIAL
+
+    forced = (np.arange(pulls_per_player) % PITY_INTERVAL) == PITY_INTERVAL - 1
+    forced_cols = np.flatnonzero(forced)
+    draws[:, forced_cols] = ssr_ids[rng.integers(0, len(ssr_ids), size=(players, len(forced_cols)))]
+
+    # First occurrence of a template within an account is "new", later ones are duplicates
+    keys = (np.arange(players)[:, None] * len(templates) + draws).ravel()
+    _, first = np.unique(keys, return_index=True)
+    is_new = np.zeros(keys.size, dtype=bool)
+    is_new[first] = True
+    is_new = is_new.reshape(players, pulls_per_player)
+
+    gold_table = np.array([get_gold_reward_by_potential(int(p)) // 2 for p in potentials])
+    gold = np.where(is_new, 0, gold_table[draws])
+
+    rarity_names = np.array([get_rarity(int(p)).split()[0] for p in potentials])
+    rarities, counts = np.unique(rarity_names[draws], return_counts=True)
+
+    total = draws.size
+    ssr_total = int((potentials[draws] >= SSR_POTENTIAL).sum())
+    return {
+        "pulls": total,
+        "rates": {r: c / total for r, c in zip(rarities, counts)},
+        "natural_ssr_rate": float(natural_ssr[:, ~forced].mean()) if (~forced).any() else 0.0,
+        "pity_rate": forced.sum() * players / total,
+        "pity_upgrade_rate": float((~natural_ssr[:, forced_cols]).mean()) if len(forced_cols) else 0.0,
+        "gems_per_ssr": GEMS_PER_PULL * total / ssr_total if ssr_total else float("inf"),
+        "gold_per_pull": float(gold.mean()),
+        "duplicate_rate": float((~is_new).mean()),
+    }
+
+
+def expected_probabilities(templates):
+    weights = np.array([summon_weight(t.potential) for t in templates], dtype=np.float64)
+    return weights / weights.sum()
+
+
+def benchmark(templates, n=1_000_000, seed=None):
+    weights = [summon_weight(t.potential) for t in templates]
+    expected = expected_probabilities(templates)
+    rows = []
+    for name, factory in SAMPLERS.items():
+        # The pure-Python samplers are orders of magnitude slower; keep their runs short
+        size = n if name.startswith("numpy") else min(n, 200_000)
+        rng = sampler_rng(name, seed)
+        sample = factory(weights)
+        start = time.perf_counter()
+        draws = sample(rng, size)
+        elapsed = time.perf_counter() - start
+        observed = np.bincount(draws, minlength=len(weights)) / size
+        tv = 0.5 * np.abs(observed - expected).sum()
+        rows.append((name, size, elapsed, size / elapsed, tv))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Monte-Carlo simulator for !summon rates.")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--pulls", type=int, default=200, help="pulls per simulated account")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sampler", choices=sorted(SAMPLERS), default="numpy-alias")
+    parser.add_argument("--bench", action="store_true", help="compare sampler speed and accuracy instead")
+    parser.add_argument("--characters", default=CHARACTER_DIR)
+    args = parser.parse_args()
+
+    templates = load_templates(args.characters)
+    if not templates:
+        raise SystemExit(f"No templates found in {args.characters}/")
+
+    if args.bench:
+        print(f"{'sampler':<16}{'draws':>10}{'seconds':>10}{'draws/s':>14}{'TV dist':>10}")
+        for name, size, elapsed, rate, tv in benchmark(templates, seed=args.seed):
+            print(f"{name:<16}{size:>10}{elapsed:>10.3f}{rate:>14,.0f}{tv:>10.4f}")
+        return
+
+    start = time.perf_counter()
+    report = simulate(templates, args.players, args.pulls, args.seed, args.sampler)
+    elapsed = time.perf_counter() - start
+
+    print(f"🎴 {report['pulls']:,} pulls over {args.players:,} accounts ({len(templates)} templates) in {elapsed:.2f}s")
+    for rarity, rate in sorted(report["rates"].items(), key=lambda kv: kv[1]):
+        print(f"  {rarity:<4} {rate:8.3%}")
+    print(f"  Natural SSR rate:      {report['natural_ssr_rate']:.3%}")
+    print(f"  Pity pulls:            {report['pity_rate']:.3%} (upgraded a non-SSR {report['pity_upgrade_rate']:.1%} of the time)")
+    print(f"  Gems per SSR:          {report['gems_per_ssr']:.1f} 💎")
+    print(f"  Gold per pull:         {report['gold_per_pull']:.1f} 💰 (duplicates: {report['duplicate_rate']:.1%})")
+
+
+if __name__ == "__main__":
+    main()